@@ -7,5 +7,7 @@ from .news_fetcher import NewsFetcher
 from .congress_trades import CongressTradesFetcher
 from .research_agent import ResearchAgent
 from .climate_agent import ClimateAgent
+from .snapshot import SymbolSnapshot, SnapshotBuilder
 
-__all__ = ['StockDataFetcher', 'NewsFetcher', 'CongressTradesFetcher', 'ResearchAgent', 'ClimateAgent']
+__all__ = ['StockDataFetcher', 'NewsFetcher', 'CongressTradesFetcher', 'ResearchAgent', 'ClimateAgent',
+           'SymbolSnapshot', 'SnapshotBuilder']
@@ -13,7 +13,9 @@ import json
 
 from .research_agent import ResearchAgent
 from .stock_data import StockDataFetcher
+from .snapshot import SymbolSnapshot, prefetch_technicals
 from services.db import save_rocket_picks, load_rocket_picks, save_history_day, load_rockets_history
+from services.universe import universe
 
 
 class BriefingEngine:
@@ -26,11 +28,6 @@ class BriefingEngine:
         with open(config_path, "r", encoding="utf-8") as f:
             self.config = json.load(f)
 
-        # Load all OMX Stockholm stocks
-        omx_path = Path(__file__).parent.parent / "config" / "omx_stockholm.json"
-        with open(omx_path, "r", encoding="utf-8") as f:
-            self.omx_data = json.load(f)
-
     def _get_agent(self) -> ResearchAgent:
         return ResearchAgent(self.config_path)
 
@@ -70,7 +67,7 @@ class BriefingEngine:
         else:
             return "closed"
 
-    def _select_rocket_picks(self, analyses: list) -> list:
+    def _select_rocket_picks(self, analyses: list, snapshots: dict = None) -> list:
         """
         Välj 2 'kursraketer' för daytrading baserat på teknisk analys.
 
@@ -78,7 +75,10 @@ class BriefingEngine:
         - Positiv signal score
         - Tekniska indikatorer (RSI, volym, trend)
         - Entry/stoploss/target beräknas automatiskt
+
+        Teknisk analys läses från samma ögonblicksbild som analysen byggde på.
         """
+        snapshots = snapshots or {}
         stock_fetcher = StockDataFetcher()
 
         # Filtrera svenska aktier med positiva signaler och pris > 0
@@ -89,6 +89,9 @@ class BriefingEngine:
             and a["stock_data"].get("current_price", 0) > 0
         ]
 
+        # Teknisk analys för alla kandidater i ett vektoriserat pass
+        prefetch_technicals([snapshots[a["symbol"]] for a in candidates if a["symbol"] in snapshots])
+
         # Poängsätt kandidater
         scored = []
         for a in candidates:
@@ -96,7 +99,8 @@ class BriefingEngine:
             score = a["signal"]["score"] * 2  # Bas från signal
 
             # Försök hämta teknisk analys
-            ta = stock_fetcher.get_technical_analysis(symbol)
+            snapshot = snapshots.get(symbol)
+            ta = snapshot.technicals if snapshot else stock_fetcher.get_technical_analysis(symbol)
             has_ta = "error" not in ta
 
             if has_ta:
@@ -564,30 +568,21 @@ class BriefingEngine:
             )
 
     def _get_all_stocks(self) -> list:
-        """Get all stocks from OMX Stockholm config."""
-        stocks_config = self.omx_data.get("stocks", {})
-        all_stocks = []
-
-        # Add Swedish stocks (Large + Mid Cap for briefings - most liquid)
-        for stock in stocks_config.get("large_cap", []):
-            all_stocks.append({**stock, "market": "OMX Stockholm"})
-        for stock in stocks_config.get("mid_cap", []):
-            all_stocks.append({**stock, "market": "OMX Stockholm"})
-
-        # Add First North stocks
-        for stock in stocks_config.get("first_north", []):
-            all_stocks.append({**stock, "market": "First North"})
-
-        # Add US watchlist for congress tracking
-        for stock in stocks_config.get("us_watchlist", []):
-            all_stocks.append(stock)
-
-        return all_stocks
+        """Get all stocks from the universe index."""
+        return [
+            # Swedish stocks (Large + Mid Cap for briefings - most liquid)
+            *universe.stocks("large"),
+            *universe.stocks("mid"),
+            # First North stocks
+            *universe.stocks("first_north"),
+            # US watchlist for congress tracking
+            *universe.stocks("us"),
+        ]
 
-    def _analyze_stock(self, agent: ResearchAgent, stock: dict) -> dict:
+    def _analyze_stock(self, agent: ResearchAgent, stock: dict, snapshot: SymbolSnapshot = None) -> dict:
         """Analyze a single stock with error handling."""
         try:
-            return agent.analyze_stock(stock["symbol"], stock["name"])
+            return agent.analyze_stock(stock["symbol"], stock["name"], snapshot=snapshot)
         except Exception as e:
             return {
                 "symbol": stock["symbol"],
@@ -615,11 +610,14 @@ class BriefingEngine:
 
         print(f"Genererar {briefing_type} briefing för {len(all_stocks)} aktier...")
 
+        # One shared snapshot per symbol; quotes are fetched in one bulk download
+        snapshots = agent.get_snapshots(all_stocks)
+
         # Analyze all stocks in parallel for speed
         analyses = []
         with ThreadPoolExecutor(max_workers=10) as executor:
             futures = {
-                executor.submit(self._analyze_stock, agent, stock): stock
+                executor.submit(self._analyze_stock, agent, stock, snapshots.get(stock["symbol"])): stock
                 for stock in all_stocks
             }
             for future in as_completed(futures):
@@ -707,7 +705,7 @@ class BriefingEngine:
 
         if briefing_type == "morning":
             # Välj och spara dagens raketer
-            rocket_picks = self._select_rocket_picks(all_sorted)
+            rocket_picks = self._select_rocket_picks(all_sorted, snapshots)
             if rocket_picks:
                 self._save_rocket_picks(rocket_picks)
                 print(f"Valde {len(rocket_picks)} raketer: {[r['symbol'] for r in rocket_picks]}")
@@ -17,6 +17,8 @@ from typing import List
 
 import yfinance as yf
 
+from services.upstream import yahoo
+
 
 class ClimateAgent:
     """Hämtar marknadsklimat, index och ekonomiska events."""
@@ -49,7 +51,7 @@ class ClimateAgent:
         for idx in self.INDICES:
             try:
                 ticker = yf.Ticker(idx["symbol"])
-                hist = ticker.history(period="5d")
+                hist = yahoo.call(ticker.history, period="5d")
 
                 if hist.empty:
                     results.append({
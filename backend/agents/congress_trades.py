@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 from typing import Optional, List
 import json
 
+from services.shared_cache import shared_cache
+
 
 class CongressTradesFetcher:
     """Hämtar och analyserar kongressmedlemmars aktiehandel."""
@@ -43,12 +45,27 @@ class CongressTradesFetcher:
         self.data = self._fetch_data()
         self._cache_timestamp = datetime.now()
         print(f"  Hämtade {len(self.data)} transaktioner")
+        if self.data:
+            # Delas via den gemensamma cachen så att omstarter och andra workers slipper hämta om
+            shared_cache.put("congress_trades", "data", (self.data, self._cache_timestamp))
+
+    def _load_persisted(self) -> bool:
+        """Läser senast hämtade data från den gemensamma cachen. Returnerar True om något fanns."""
+        stored = shared_cache.get("congress_trades", "data")
+        if not stored:
+            return False
+        self.data, self._cache_timestamp = stored[0]
+        return True
+
+    def _expired(self) -> bool:
+        return bool(self._cache_timestamp) and datetime.now() - self._cache_timestamp > self._cache_duration
 
     def _ensure_data(self):
         """Ser till att vi har data (hämtar om det behövs eller cache har utgått)."""
-        if self.data is None:
-            self.refresh_data()
-        elif self._cache_timestamp and datetime.now() - self._cache_timestamp > self._cache_duration:
+        if self.data is not None and not self._expired():
+            return
+        # En annan worker kan redan ha hämtat färsk data
+        if not self._load_persisted() or self._expired():
             self.refresh_data()
 
     def get_recent_trades(self, days: int = 30, min_amount: str = "$1,001 -") -> list:
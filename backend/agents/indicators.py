@@ -0,0 +1,429 @@
+"""
+indicators.py - Vektoriserad teknisk analys för hela universumet
+
+Tar en bred prispanel (datum × symbol) och räknar RSI, ATR, MA20,
+volymspik och stöd/motstånd för alla symboler med ett fåtal
+NumPy-operationer. Resultatet per symbol är samma dict som
+StockDataFetcher.get_technical_analysis alltid har returnerat.
+"""
+
+from collections import deque
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+# Minsta antal bars för att analysen ska räknas som meningsfull
+MIN_BARS = 20
+
+
+def _pack(panel: Dict[str, pd.DataFrame]):
+    """
+    Packar varje symbols giltiga rader längst ner i matrisen.
+
+    Motsvarar dropna() per symbol: en symbol som saknar bars vissa dagar
+    (t.ex. svenska vs amerikanska helgdagar) får sina egna bars i följd,
+    högerjusterade så att sista raden alltid är senaste bar.
+
+    Returns:
+        (close, high, low, volume, n) där n är antal giltiga bars per symbol
+    """
+    close = panel["Close"].to_numpy(dtype=float)
+    valid = ~np.isnan(close)
+    # Ogiltiga rader först, giltiga efter - i ursprunglig ordning
+    order = np.argsort(valid, axis=0, kind="stable")
+    n = valid.sum(axis=0)
+    rows = np.arange(close.shape[0])[:, None]
+    keep = rows >= close.shape[0] - n
+
+    def pack(field):
+        values = np.take_along_axis(panel[field].to_numpy(dtype=float), order, axis=0)
+        return np.where(keep, values, np.nan)
+
+    return pack("Close"), pack("High"), pack("Low"), pack("Volume"), n
+
+
+def compute_technicals(panel: Dict[str, pd.DataFrame]) -> Dict[str, dict]:
+    """
+    Beräknar tekniska indikatorer för alla symboler i en panel.
+
+    Args:
+        panel: Dict "Open"/"High"/"Low"/"Close"/"Volume" -> DataFrame (datum × symbol)
+
+    Returns:
+        Dict symbol -> samma dict som get_technical_analysis
+    """
+    symbols = list(panel["Close"].columns)
+    if not symbols:
+        return {}
+
+    close, high, low, volume, n = _pack(panel)
+    results = {}
+
+    if close.shape[0] < MIN_BARS:
+        return {
+            symbol: {"error": f"För lite data för {symbol} ({int(count)} rader)"}
+            for symbol, count in zip(symbols, n)
+        }
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        current_price = close[-1]
+
+        # === RSI (14 perioder) ===
+        delta = np.diff(close[-15:], axis=0)
+        gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+        loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+        rs = gain / np.where(loss == 0, 0.0001, loss)
+        rsi = 100 - (100 / (1 + rs))
+
+        # Fallback om RSI saknas: enklare RSI på summor över samma period
+        gains_sum = gain * 14
+        losses_sum = loss * 14
+        fallback_rsi = np.where(
+            losses_sum > 0, 100 - (100 / (1 + gains_sum / losses_sum)), 70.0
+        )
+        rsi = np.where(np.isnan(rsi), fallback_rsi, rsi)
+
+        # === Stöd och Motstånd (senaste 20 dagar) ===
+        recent_high = np.nanmax(high[-MIN_BARS:], axis=0)
+        recent_low = np.nanmin(low[-MIN_BARS:], axis=0)
+
+        # Lokala toppar/bottnar på rad i, för i i [start + 2, slut - 3]
+        mid_high, mid_low = high[1:-1], low[1:-1]
+        is_top = (mid_high > high[:-2]) & (mid_high > high[2:])
+        is_bottom = (mid_low < low[:-2]) & (mid_low < low[2:])
+
+        rows = np.arange(1, close.shape[0] - 1)[:, None]
+        in_range = (rows >= close.shape[0] - n + 2) & (rows <= close.shape[0] - 3)
+        is_top &= in_range
+        is_bottom &= in_range
+
+        # Närmaste motstånd över och närmaste stöd under aktuellt pris
+        above = np.where(is_top & (mid_high > current_price), mid_high, np.inf).min(axis=0)
+        below = np.where(is_bottom & (mid_low < current_price), mid_low, -np.inf).max(axis=0)
+        resistance = np.where(np.isinf(above), recent_high, above)
+        support = np.where(np.isinf(below), recent_low, below)
+
+        # === Volymanalys ===
+        avg_volume = np.nanmean(volume[-MIN_BARS:], axis=0)
+        current_volume = volume[-1]
+
+        # === ATR (14 perioder) ===
+        prev_close = close[-15:-1]
+        tr = np.fmax(
+            high[-14:] - low[-14:],
+            np.fmax(np.abs(high[-14:] - prev_close), np.abs(low[-14:] - prev_close)),
+        )
+        atr = tr.mean(axis=0)
+
+        # Trend (20-dagars MA)
+        ma20 = close[-MIN_BARS:].mean(axis=0)
+
+    for j, symbol in enumerate(symbols):
+        if n[j] < MIN_BARS:
+            results[symbol] = {"error": f"För lite data för {symbol} ({int(n[j])} rader)"}
+            continue
+        try:
+            results[symbol] = _build_result(
+                symbol,
+                price=float(current_price[j]),
+                rsi=np.float64(rsi[j]),
+                support=float(support[j]),
+                resistance=float(resistance[j]),
+                avg_volume=float(avg_volume[j]),
+                current_volume=float(current_volume[j]),
+                atr=float(atr[j]),
+                ma20=np.float64(ma20[j]),
+            )
+        except Exception as e:
+            results[symbol] = {"error": str(e), "symbol": symbol}
+
+    return results
+
+
+def _build_result(
+    symbol: str,
+    price: float,
+    rsi: np.float64,
+    support: float,
+    resistance: float,
+    avg_volume: float,
+    current_volume: float,
+    atr: float,
+    ma20: np.float64,
+) -> dict:
+    """Entry/stoploss/target och signaler för en symbol utifrån färdiga indikatorer."""
+    volume_spike = current_volume / avg_volume if avg_volume > 0 else 1.0
+
+    # Fallback om ATR är NaN
+    if pd.isna(atr) or atr <= 0:
+        atr = price * 0.02  # 2% som fallback
+
+    # === Entry, Stoploss, Target för daytrading ===
+    entry_price = round(price, 2)
+
+    # Stoploss: 2x ATR under entry, eller strax under support
+    atr_stop = price - (2 * atr)
+    support_stop = support * 0.99
+    stoploss = round(max(atr_stop, support_stop), 2)
+
+    # Target: 3x risk (risk/reward 1:3) eller motstånd
+    risk = price - stoploss
+    atr_target = price + (3 * risk)
+    target = round(min(atr_target, resistance * 0.99), 2)  # 1% under resistance
+
+    # Garantera rimliga nivåer
+    if stoploss >= price:
+        stoploss = round(price * 0.96, 2)  # -4% fallback
+    if target <= price:
+        target = round(price * 1.05, 2)  # +5% fallback
+
+    # === Beräkna procent ===
+    stoploss_pct = round(((stoploss - price) / price) * 100, 1)
+    target_pct = round(((target - price) / price) * 100, 1)
+
+    # === Tekniska signaler ===
+    signals = []
+
+    if rsi < 30:
+        signals.append("RSI översåld (<30) - potential för studs")
+    elif rsi > 70:
+        signals.append("RSI överköpt (>70) - varning")
+    elif 40 <= rsi <= 60:
+        signals.append(f"RSI neutral ({rsi:.0f})")
+
+    if volume_spike > 1.5:
+        signals.append(f"Volymspike: {volume_spike:.1f}x genomsnitt")
+
+    if price > resistance * 0.98:
+        signals.append(f"Testar motstånd vid {resistance:.2f}")
+
+    if price < support * 1.02:
+        signals.append(f"Nära stöd vid {support:.2f}")
+
+    if price > ma20:
+        signals.append("Över 20-dagars MA (upptrend)")
+    else:
+        signals.append("Under 20-dagars MA (nedtrend)")
+
+    return {
+        "symbol": symbol,
+        "current_price": round(price, 2),
+        "rsi": round(rsi, 1),
+        "support": round(support, 2),
+        "resistance": round(resistance, 2),
+        "atr": round(atr, 2),
+        "volume_spike": round(volume_spike, 2),
+        "entry_price": entry_price,
+        "stoploss": stoploss,
+        "stoploss_pct": stoploss_pct,
+        "target": target,
+        "target_pct": target_pct,
+        "signals": signals,
+        "ma20": round(ma20, 2),
+        "trend": "up" if price > ma20 else "down"
+    }
+
+
+class IndicatorState:
+    """
+    Inkrementellt indikatortillstånd för en symbol.
+
+    Håller löpande summor för RSI (vinster/förluster), ATR, MA20 och
+    volymsnitt samt lokala toppar/bottnar i 3-månadersfönstret. En ny bar
+    (eller en uppdaterad dagsbar) kostar O(1) i stället för att bygga om
+    en DataFrame, och tillståndet kan sparas som JSON mellan omstarter.
+
+    Ger samma dict som compute_technicals för samma bars.
+    """
+
+    RSI_PERIOD = 14
+    ATR_PERIOD = 14
+    # Räkna om summorna från fönstren då och då så att flyttalsfel inte växer
+    RESYNC_EVERY = 500
+
+    def __init__(self):
+        self.last_time = None
+        self.last_close = None
+        self.prev_close = None
+        self.deltas = deque(maxlen=self.RSI_PERIOD)
+        self.trs = deque(maxlen=self.ATR_PERIOD)
+        self.closes = deque(maxlen=MIN_BARS)
+        self.highs = deque(maxlen=MIN_BARS)
+        self.lows = deque(maxlen=MIN_BARS)
+        self.volumes = deque(maxlen=MIN_BARS)
+        # (tid, high, low) för alla bars i 3-månadersfönstret
+        self.window = deque()
+        self.tops = deque()
+        self.bottoms = deque()
+        self._pushes = 0
+        self._resync()
+
+    def _resync(self):
+        self.gain_sum = sum(d for d in self.deltas if d > 0)
+        self.loss_sum = sum(-d for d in self.deltas if d < 0)
+        self.tr_sum = sum(self.trs)
+        self.close_sum = sum(self.closes)
+        self.volume_sum = sum(v for v in self.volumes if not np.isnan(v))
+
+    @staticmethod
+    def _push(window: deque, value: float) -> float:
+        """Lägger till ett värde och returnerar värdet som föll ut (eller 0)."""
+        dropped = window[0] if len(window) == window.maxlen else 0.0
+        window.append(value)
+        return dropped
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self.prev_close is None:
+            return high - low
+        return np.fmax(high - low, np.fmax(abs(high - self.prev_close), abs(low - self.prev_close)))
+
+    def update(self, time: int, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        Applicerar en bar. Samma tidsstämpel som senaste bar ersätter den
+        (dagens bar under handel), en senare tidsstämpel lägger till en ny.
+
+        Returns:
+            False om baren är äldre än tillståndet (kräver ombyggnad)
+        """
+        if self.last_time is not None and time < self.last_time:
+            return False
+
+        if time == self.last_time:
+            delta = close - self.prev_close if self.prev_close is not None else None
+            if delta is not None and self.deltas:
+                old = self.deltas[-1]
+                self.gain_sum += max(delta, 0) - max(old, 0)
+                self.loss_sum += max(-delta, 0) - max(-old, 0)
+                self.deltas[-1] = delta
+            tr = self._true_range(high, low)
+            self.tr_sum += tr - self.trs[-1]
+            self.trs[-1] = tr
+            self.close_sum += close - self.closes[-1]
+            self.closes[-1] = close
+            self.highs[-1] = high
+            self.lows[-1] = low
+            self.volume_sum += np.nan_to_num(volume) - np.nan_to_num(self.volumes[-1])
+            self.volumes[-1] = volume
+            self.window[-1] = (time, high, low)
+            self.last_close = close
+            return True
+
+        self.prev_close = self.last_close
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            dropped = self._push(self.deltas, delta)
+            self.gain_sum += max(delta, 0) - max(dropped, 0)
+            self.loss_sum += max(-delta, 0) - max(-dropped, 0)
+
+        tr = self._true_range(high, low)
+        self.tr_sum += tr - self._push(self.trs, tr)
+        self.close_sum += close - self._push(self.closes, close)
+        self._push(self.highs, high)
+        self._push(self.lows, low)
+        self.volume_sum += np.nan_to_num(volume) - np.nan_to_num(self._push(self.volumes, volume))
+
+        self.window.append((time, high, low))
+        # Baren två steg bak har nu grannar på båda sidor (samma som i < len - 2)
+        if len(self.window) >= 4:
+            (_, h0, l0), (t1, h1, l1), (_, h2, l2) = self.window[-4], self.window[-3], self.window[-2]
+            if h1 > h0 and h1 > h2:
+                self.tops.append((t1, h1))
+            if l1 < l0 and l1 < l2:
+                self.bottoms.append((t1, l1))
+
+        self.last_time = time
+        self.last_close = close
+        self._pushes += 1
+        if self._pushes % self.RESYNC_EVERY == 0:
+            self._resync()
+        return True
+
+    def result(self, symbol: str, start=None) -> dict:
+        """
+        Indikatordict för fönstret från start (standard: 3 månader bakåt).
+        Bars före start släpps ur tillståndet.
+        """
+        if start is None:
+            start = pd.Timestamp.now().normalize() - pd.DateOffset(months=3)
+        cutoff = pd.Timestamp(start).value
+        while self.window and self.window[0][0] < cutoff:
+            self.window.popleft()
+
+        n = len(self.window)
+        if n < MIN_BARS:
+            return {"error": f"För lite data för {symbol} ({n} rader)"}
+
+        # Extrempunkter räknas bara från och med fönstrets tredje bar
+        first_valid = self.window[2][0]
+        while self.tops and self.tops[0][0] < first_valid:
+            self.tops.popleft()
+        while self.bottoms and self.bottoms[0][0] < first_valid:
+            self.bottoms.popleft()
+
+        price = float(self.last_close)
+        gain = self.gain_sum / self.RSI_PERIOD
+        loss = self.loss_sum / self.RSI_PERIOD
+        rs = gain / (loss if loss != 0 else 0.0001)
+        rsi = 100 - (100 / (1 + rs))
+
+        recent_high = max(self.highs)
+        recent_low = min(self.lows)
+        resistance = min((v for _, v in self.tops if v > price), default=recent_high)
+        support = max((v for _, v in self.bottoms if v < price), default=recent_low)
+
+        volume_count = sum(1 for v in self.volumes if not np.isnan(v))
+        avg_volume = self.volume_sum / volume_count if volume_count else np.nan
+
+        return _build_result(
+            symbol,
+            price=price,
+            rsi=np.float64(rsi),
+            support=float(support),
+            resistance=float(resistance),
+            avg_volume=float(avg_volume),
+            current_volume=float(self.volumes[-1]),
+            atr=float(self.tr_sum / self.ATR_PERIOD),
+            ma20=np.float64(self.close_sum / MIN_BARS),
+        )
+
+    @classmethod
+    def from_bars(cls, bars: pd.DataFrame) -> "IndicatorState":
+        """Bygger tillstånd från en OHLCV-DataFrame (äldst först)."""
+        state = cls()
+        frame = bars.dropna(subset=["Close"])
+        times = frame.index.as_unit("ns").asi8
+        for t, h, l, c, v in zip(times, frame["High"], frame["Low"], frame["Close"], frame["Volume"]):
+            state.update(int(t), float(h), float(l), float(c), float(v))
+        return state
+
+    def to_dict(self) -> dict:
+        return {
+            "last_time": self.last_time,
+            "last_close": self.last_close,
+            "prev_close": self.prev_close,
+            "deltas": list(self.deltas),
+            "trs": list(self.trs),
+            "closes": list(self.closes),
+            "highs": list(self.highs),
+            "lows": list(self.lows),
+            "volumes": list(self.volumes),
+            "window": list(self.window),
+            "tops": list(self.tops),
+            "bottoms": list(self.bottoms),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls()
+        state.last_time = data["last_time"]
+        state.last_close = data["last_close"]
+        state.prev_close = data["prev_close"]
+        for name in ("deltas", "trs", "closes", "highs", "lows", "volumes"):
+            getattr(state, name).extend(data[name])
+        state.window.extend(tuple(w) for w in data["window"])
+        state.tops.extend(tuple(t) for t in data["tops"])
+        state.bottoms.extend(tuple(b) for b in data["bottoms"])
+        state._resync()
+        return state
@@ -2,18 +2,37 @@
 news_fetcher.py - Hämtar och analyserar nyheter från RSS-flöden
 
 Funktioner:
-- Hämtar nyheter från svenska och internationella källor
+- Hämtar nyheter från svenska och internationella källor, parallellt och
+  med villkorliga anrop (ETag / Last-Modified) så att oförändrade flöden
+  varken laddas ner eller parsas om
 - Filtrerar nyheter relaterade till specifika aktier/bolag
 - Enkel sentimentanalys baserad på nyckelord
 """
 
 import feedparser
+import hashlib
 import json
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 import re
 
+from services.company_tagger import company_keywords, company_tagger
+from services.news_corpus import news_corpus
+from services.shared_cache import shared_cache
+
+
+# Timeout per flöde i sekunder (anslutning, läsning)
+FEED_TIMEOUT = (5, 10)
+
+# Max antal flöden som hämtas samtidigt
+MAX_FEED_WORKERS = 8
+
+# Hur länge ETag/Last-Modified och senast parsade artiklar sparas per flöde
+FEED_STATE_TTL = 7 * 24 * 3600
+
 
 class NewsFetcher:
     """Hämtar och filtrerar nyheter från RSS-flöden."""
@@ -27,58 +46,115 @@ class NewsFetcher:
         
         self.sentiment_keywords = self.config.get("settings", {}).get("sentiment_keywords", {})
     
+    @staticmethod
+    def _parse_articles(feed) -> list:
+        """Plockar ut artiklar ur ett parsat flöde."""
+        articles = []
+        
+        for entry in feed.entries[:20]:  # Max 20 artiklar per källa
+            published = entry.get("published_parsed")
+            if published:
+                pub_date = datetime(*published[:6])
+            else:
+                pub_date = datetime.now()
+            
+            articles.append({
+                "title": entry.get("title", ""),
+                "summary": entry.get("summary", "")[:500],  # Begränsa längd
+                "link": entry.get("link", ""),
+                "published": pub_date.isoformat(),
+                "source": feed.feed.get("title", "Okänd källa")
+            })
+        
+        return articles
+    
     def fetch_feed(self, url: str) -> list:
         """
         Hämtar artiklar från ett RSS-flöde.
         
+        Skickar If-None-Match / If-Modified-Since från förra hämtningen. Svarar
+        servern 304, eller är innehållet byte för byte detsamma, återanvänds
+        de redan parsade artiklarna utan ny parsning.
+        
         Args:
             url: RSS-flödets URL
             
         Returns:
             Lista med artiklar
         """
+        stored = shared_cache.get("news_feeds", url)
+        state = stored[0] if stored else {}
+        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        conditional = dict(headers)
+        if state.get("etag"):
+            conditional["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            conditional["If-Modified-Since"] = state["modified"]
+        
         try:
-            feed = feedparser.parse(url)
-            articles = []
+            response = requests.get(url, headers=conditional, timeout=FEED_TIMEOUT)
+            if response.status_code == 304:
+                if "articles" in state:
+                    return state["articles"]
+                # 304 utan sparade artiklar att återanvända: hämta om villkorslöst
+                response = requests.get(url, headers=headers, timeout=FEED_TIMEOUT)
+                if response.status_code == 304:
+                    raise requests.HTTPError(f"304 på en villkorslös förfrågan från {url}")
+            response.raise_for_status()
             
-            for entry in feed.entries[:20]:  # Max 20 artiklar per källa
-                published = entry.get("published_parsed")
-                if published:
-                    pub_date = datetime(*published[:6])
-                else:
-                    pub_date = datetime.now()
-                
-                articles.append({
-                    "title": entry.get("title", ""),
-                    "summary": entry.get("summary", "")[:500],  # Begränsa längd
-                    "link": entry.get("link", ""),
-                    "published": pub_date.isoformat(),
-                    "source": feed.feed.get("title", "Okänd källa")
-                })
+            digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+            if digest == state.get("digest") and "articles" in state:
+                articles = state["articles"]
+            else:
+                # Svarshuvudena behövs för teckenkodningen (charset i Content-Type)
+                articles = self._parse_articles(
+                    feedparser.parse(response.content, response_headers=dict(response.headers))
+                )
             
+            shared_cache.put("news_feeds", url, {
+                "etag": response.headers.get("ETag"),
+                "modified": response.headers.get("Last-Modified"),
+                "digest": digest,
+                "articles": articles,
+            }, ttl=FEED_STATE_TTL)
             return articles
             
         except Exception as e:
             print(f"Fel vid hämtning av {url}: {e}")
-            return []
+            # Hellre förra hämtningens artiklar än inga alls
+            return state.get("articles", [])
     
     def fetch_all_news(self) -> list:
-        """Hämtar nyheter från alla konfigurerade källor."""
-        all_articles = []
+        """Hämtar nyheter från alla konfigurerade källor (parallellt)."""
+        feeds = [
+            (category, feed_config["url"])
+            for category in ["swedish", "international"]
+            for feed_config in self.config.get("news_feeds", {}).get(category, [])
+        ]
+        if not feeds:
+            return []
         
-        for category in ["swedish", "international"]:
-            feeds = self.config.get("news_feeds", {}).get(category, [])
-            for feed_config in feeds:
-                articles = self.fetch_feed(feed_config["url"])
-                for article in articles:
-                    article["category"] = category
-                all_articles.extend(articles)
+        # En uppdatering tar ungefär så lång tid som det långsammaste flödet
+        with ThreadPoolExecutor(max_workers=min(MAX_FEED_WORKERS, len(feeds))) as executor:
+            results = list(executor.map(self.fetch_feed, [url for _, url in feeds]))
+        
+        all_articles = []
+        for (category, _), articles in zip(feeds, results):
+            # Kopior: sparade artiklar återanvänds mellan hämtningar
+            all_articles.extend({**article, "category": category} for article in articles)
         
         # Sortera efter datum (nyast först)
         all_articles.sort(key=lambda x: x["published"], reverse=True)
         
         return all_articles
     
+    def get_corpus(self) -> list:
+        """
+        Delad nyhetskorpus från alla källor, hämtas högst en gång per
+        uppdateringsintervall. Artiklarna delas och får inte ändras.
+        """
+        return news_corpus.articles(self.fetch_all_news)
+
     def filter_by_company(self, articles: list, company_name: str, symbol: str = None) -> list:
         """
         Filtrerar artiklar som nämner ett specifikt bolag.
@@ -91,16 +167,8 @@ class NewsFetcher:
         Returns:
             Filtrerade artiklar
         """
-        keywords = [company_name.lower()]
-        
-        # Lägg till varianter av namnet
-        if " " in company_name:
-            keywords.append(company_name.split()[0].lower())  # Första ordet
-        
-        if symbol:
-            # Ta bort .ST suffix för svenska aktier
-            clean_symbol = symbol.replace(".ST", "").replace("-B", "").replace("-A", "")
-            keywords.append(clean_symbol.lower())
+        # Namnet, första ordet i namnet och symbolen utan .ST/-A/-B
+        keywords = company_keywords(company_name, symbol)
         
         filtered = []
         for article in articles:
@@ -110,6 +178,28 @@ class NewsFetcher:
         
         return filtered
     
+    def company_articles(self, company_name: str, symbol: str = None) -> list:
+        """
+        Artiklar i nyhetskorpusen som nämner ett bolag.
+        
+        Bolag i universumet slås upp i taggarens inverterade index (korpusen
+        taggas en gång per version); övriga filtreras linjärt.
+        """
+        version, corpus = news_corpus.get(self.fetch_all_news)
+        articles = company_tagger.articles_for(version, corpus, company_name, symbol)
+        if articles is None:
+            articles = self.filter_by_company(corpus, company_name, symbol)
+        return articles
+    
+    def tag_companies(self, articles: list) -> list:
+        """
+        Kopior av korpusartiklar med symbolerna för de universumbolag de
+        nämner (fältet "companies"), från taggarens index.
+        """
+        version, corpus = news_corpus.get(self.fetch_all_news)
+        tags = company_tagger.tags(version, corpus, articles)
+        return [{**article, "companies": sorted(symbols)} for article, symbols in zip(articles, tags)]
+    
     def analyze_sentiment(self, text: str) -> dict:
         """
         Enkel sentimentanalys baserad på nyckelord.
@@ -158,13 +248,11 @@ class NewsFetcher:
         Returns:
             Sammanfattning med nyheter och sentiment
         """
-        all_news = self.fetch_all_news()
-        company_news = self.filter_by_company(all_news, company_name, symbol)
-        
-        # Analysera sentiment för varje artikel
-        for article in company_news:
-            text = article["title"] + " " + article["summary"]
-            article["sentiment"] = self.analyze_sentiment(text)
+        # Analysera sentiment för varje artikel (på kopior, korpusen är delad)
+        company_news = [
+            {**article, "sentiment": self.analyze_sentiment(article["title"] + " " + article["summary"])}
+            for article in self.company_articles(company_name, symbol)
+        ]
         
         # Räkna ut övergripande sentiment
         if company_news:
@@ -11,11 +11,12 @@ Detta är "hjärnan" som:
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 from .stock_data import StockDataFetcher
 from .news_fetcher import NewsFetcher
 from .congress_trades import CongressTradesFetcher
+from .snapshot import SnapshotBuilder, SymbolSnapshot
 
 
 class ResearchAgent:
@@ -31,31 +32,38 @@ class ResearchAgent:
         self.stock_fetcher = StockDataFetcher()
         self.news_fetcher = NewsFetcher(config_path)
         self.congress_fetcher = CongressTradesFetcher()
+        self.snapshots = SnapshotBuilder(self.stock_fetcher, self.news_fetcher, self.congress_fetcher)
     
-    def analyze_stock(self, symbol: str, name: str) -> dict:
+    def get_snapshots(self, stocks: List[dict]) -> Dict[str, SymbolSnapshot]:
+        """
+        Hämtar ögonblicksbilder för flera aktier (kurser hämtas i bulk).
+
+        Args:
+            stocks: Lista med dicts som har 'symbol' och 'name'
+        """
+        return self.snapshots.build(stocks)
+
+    def analyze_stock(self, symbol: str, name: str, snapshot: Optional[SymbolSnapshot] = None) -> dict:
         """
         Gör en komplett analys av en aktie.
         
         Args:
             symbol: Aktiesymbol
             name: Bolagsnamn
+            snapshot: Redan hämtad ögonblicksbild (t.ex. från get_snapshots)
             
         Returns:
             Komplett analysresultat
         """
         print(f"  Analyserar {name} ({symbol})...")
         
-        # Hämta aktiedata
-        stock_data = self.stock_fetcher.get_stock_info(symbol)
-        activity = self.stock_fetcher.check_unusual_activity(symbol)
-        
-        # Hämta nyheter
-        news_summary = self.news_fetcher.get_news_summary(name, symbol)
-        
-        # Kolla kongresshandel (för amerikanska aktier)
-        # Extrahera ren ticker utan .ST suffix
-        clean_ticker = symbol.replace(".ST", "").replace("-B", "").replace("-A", "").upper()
-        congress_activity = self.congress_fetcher.check_ticker_congress_activity(clean_ticker)
+        if snapshot is None:
+            snapshot = self.snapshots.get(symbol, name)
+
+        stock_data = snapshot.quote
+        activity = snapshot.activity
+        news_summary = snapshot.news
+        congress_activity = snapshot.congress
         
         # Kombinera till en "signal"
         signal = self._generate_signal(stock_data, activity, news_summary, congress_activity)
@@ -148,10 +156,11 @@ class ResearchAgent:
         print(f"{'='*60}\n")
         
         watchlist = self.config.get("watchlist", [])
+        snapshots = self.get_snapshots(watchlist)
         results = []
         
         for stock in watchlist:
-            analysis = self.analyze_stock(stock["symbol"], stock["name"])
+            analysis = self.analyze_stock(stock["symbol"], stock["name"], snapshot=snapshots[stock["symbol"]])
             results.append(analysis)
         
         # Hämta kongressöversikt
@@ -0,0 +1,209 @@
+"""
+snapshot.py - En gemensam ögonblicksbild per symbol och uppdateringscykel
+
+Analys, ovanlig aktivitet, raketval och marknadsklimat läser alla från
+samma SymbolSnapshot, så att en briefing gör högst en hämtning per symbol:
+- Kurs hämtas i bulk för alla symboler som saknar färsk ögonblicksbild
+- Aktivitet, teknisk analys, nyheter och kongresshandel räknas ut första
+  gången de efterfrågas och återanvänds sedan under resten av cykeln
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List
+
+from .stock_data import StockDataFetcher
+from .news_fetcher import NewsFetcher
+from .congress_trades import CongressTradesFetcher
+
+
+# Delas mellan alla SnapshotBuilder-instanser (routrar skapar nya agenter per anrop).
+# Ordnade efter när de skapades, äldst först.
+_snapshots: "OrderedDict[str, SymbolSnapshot]" = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+# Högst så många ögonblicksbilder sparas (universumet plus enstaka uppslag)
+MAX_SNAPSHOTS = 1000
+
+
+def _remember(snapshots: Dict[str, "SymbolSnapshot"], max_age: float):
+    """
+    Sparar ögonblicksbilder och rensar bort de som passerat max_age, samt de
+    äldsta om fler än MAX_SNAPSHOTS finns (anroparen håller låset).
+    """
+    for symbol, snapshot in snapshots.items():
+        _snapshots[symbol] = snapshot
+        _snapshots.move_to_end(symbol)
+    while _snapshots:
+        oldest = next(iter(_snapshots.values()))
+        if oldest.age < max_age and len(_snapshots) <= MAX_SNAPSHOTS:
+            break
+        _snapshots.popitem(last=False)
+
+
+class SymbolSnapshot:
+    """Allt vi vet om en symbol under en uppdateringscykel."""
+
+    def __init__(self, symbol: str, name: str, quote: dict, builder: "SnapshotBuilder"):
+        self.symbol = symbol
+        self.name = name
+        self.quote = quote
+        self.created_at = time.monotonic()
+        self._builder = builder
+        self._parts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def age(self) -> float:
+        """Sekunder sedan ögonblicksbilden skapades."""
+        return time.monotonic() - self.created_at
+
+    @property
+    def activity(self) -> dict:
+        """Flaggor för ovanlig aktivitet (volym, stor rörelse, 52v-nivåer)."""
+        return self._get("activity")
+
+    @property
+    def technicals(self) -> dict:
+        """Teknisk analys (RSI, stöd/motstånd, entry/stoploss/target)."""
+        return self._get("technicals")
+
+    @property
+    def news(self) -> dict:
+        """Nyhetssammanfattning med sentiment för bolaget."""
+        return self._get("news")
+
+    @property
+    def congress(self) -> dict:
+        """Kongresshandel i symbolen senaste 90 dagarna."""
+        return self._get("congress")
+
+    def _get(self, part: str) -> dict:
+        with self._lock:
+            if part not in self._parts:
+                self._parts[part] = self._builder.compute(part, self)
+            return self._parts[part]
+
+
+class SnapshotBuilder:
+    """Skapar och återanvänder SymbolSnapshot per uppdateringscykel."""
+
+    # Så länge en ögonblicksbild räknas som aktuell
+    CYCLE_SECONDS = 300
+
+    def __init__(
+        self,
+        stock_fetcher: StockDataFetcher,
+        news_fetcher: NewsFetcher,
+        congress_fetcher: CongressTradesFetcher,
+    ):
+        self.stock_fetcher = stock_fetcher
+        self.news_fetcher = news_fetcher
+        self.congress_fetcher = congress_fetcher
+
+    def build(self, stocks: List[dict]) -> Dict[str, SymbolSnapshot]:
+        """
+        Hämtar ögonblicksbilder för en lista aktier.
+
+        Args:
+            stocks: Lista med dicts som har 'symbol' och 'name'
+
+        Returns:
+            Dict symbol -> SymbolSnapshot
+        """
+        names = {s["symbol"]: s.get("name", s["symbol"]) for s in stocks}
+
+        with _snapshots_lock:
+            result = {
+                symbol: _snapshots[symbol]
+                for symbol in names
+                if symbol in _snapshots and _snapshots[symbol].age < self.CYCLE_SECONDS
+            }
+
+        missing = [symbol for symbol in names if symbol not in result]
+        if missing:
+            quotes = self.stock_fetcher.get_stock_infos(missing)
+            fresh = {
+                symbol: SymbolSnapshot(symbol, names[symbol], quotes[symbol], self)
+                for symbol in missing
+            }
+            with _snapshots_lock:
+                # Misslyckade kurser cachas inte, nästa anrop försöker igen
+                _remember({s: snap for s, snap in fresh.items() if "error" not in snap.quote}, self.CYCLE_SECONDS)
+            result.update(fresh)
+
+        return result
+
+    def get(self, symbol: str, name: str = None) -> SymbolSnapshot:
+        """Ögonblicksbild för en enskild symbol."""
+        return self.build([{"symbol": symbol, "name": name or symbol}])[symbol]
+
+    def from_quote(self, symbol: str, name: str, quote: dict) -> SymbolSnapshot:
+        """
+        Ögonblicksbild för en redan hämtad kurs (t.ex. från kurspollern).
+        Återanvänder cykelns ögonblicksbild om den har samma kurs.
+        """
+        with _snapshots_lock:
+            snapshot = _snapshots.get(symbol)
+            if snapshot is not None and snapshot.quote is quote and snapshot.age < self.CYCLE_SECONDS:
+                return snapshot
+            snapshot = SymbolSnapshot(symbol, name or symbol, quote, self)
+            if "error" not in quote:
+                _remember({symbol: snapshot}, self.CYCLE_SECONDS)
+        return snapshot
+
+    def prefetch_technicals(self, snapshots: List[SymbolSnapshot]):
+        """
+        Räknar teknisk analys för många ögonblicksbilder i ett vektoriserat pass.
+        Ögonblicksbilder som redan har teknisk analys lämnas orörda.
+        """
+        pending = [s for s in snapshots if "technicals" not in s._parts]
+        if not pending:
+            return
+        technicals = self.stock_fetcher.get_technical_analyses([s.symbol for s in pending])
+        for snapshot in pending:
+            with snapshot._lock:
+                snapshot._parts.setdefault("technicals", technicals[snapshot.symbol])
+
+    def compute(self, part: str, snapshot: SymbolSnapshot) -> dict:
+        """Räknar ut en del av en ögonblicksbild."""
+        symbol = snapshot.symbol
+
+        if part == "activity":
+            return self.stock_fetcher.check_unusual_activity(symbol, info=snapshot.quote)
+
+        if part == "technicals":
+            # Bar-lagret synkades när kursen hämtades, så detta läser bara lokalt
+            return self.stock_fetcher.get_technical_analysis(symbol)
+
+        if part == "news":
+            return self.news_fetcher.get_news_summary(snapshot.name, symbol)
+
+        if part == "congress":
+            # Extrahera ren ticker utan .ST suffix
+            clean_ticker = symbol.replace(".ST", "").replace("-B", "").replace("-A", "").upper()
+            return self.congress_fetcher.check_ticker_congress_activity(clean_ticker)
+
+        raise ValueError(f"Okänd del av ögonblicksbild: {part}")
+
+
+def prefetch_technicals(snapshots: List[SymbolSnapshot]):
+    """Vektoriserad teknisk analys för ögonblicksbilder från valfria byggare."""
+    by_builder = {}
+    for snapshot in snapshots:
+        by_builder.setdefault(id(snapshot._builder), (snapshot._builder, []))[1].append(snapshot)
+    for builder, group in by_builder.values():
+        builder.prefetch_technicals(group)
+
+
+def discard_snapshot(symbol: str):
+    """Tar bort en symbols ögonblicksbild så att nästa anrop bygger en ny."""
+    with _snapshots_lock:
+        _snapshots.pop(symbol, None)
+
+
+def clear_snapshots():
+    """Tömmer alla ögonblicksbilder så att nästa cykel hämtar om allt."""
+    with _snapshots_lock:
+        _snapshots.clear()
@@ -9,16 +9,42 @@ Använder yfinance för att hämta:
 
 import yfinance as yf
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 
+from .indicators import IndicatorState, compute_technicals
+from services.bar_store import BarStore, bar_store as default_bar_store
+from services.cache import SingleFlight
+from services.indicator_state import IndicatorStateStore, indicator_states as default_indicator_states
+from services.market_calendar import calendar_for
+from services.reference_data import reference_data
+from services.upstream import yahoo
+
+
+# Symboler som just nu synkas mot Yahoo (delas mellan alla instanser)
+_sync_flight = SingleFlight()
+
 
 class StockDataFetcher:
     """Hämtar och bearbetar aktiedata."""
+
+    # Max antal symboler per bulk-nedladdning mot Yahoo
+    BULK_CHUNK_SIZE = 200
+    # Sekunder som lagrade bars räknas som aktuella innan vi synkar igen
+    SYNC_INTERVAL = 300
+    # Historik som hämtas första gången en symbol hamnar i bar-lagret
+    INITIAL_PERIOD = "1y"
     
-    def __init__(self):
+    def __init__(
+        self,
+        bar_store: Optional[BarStore] = None,
+        indicator_states: Optional[IndicatorStateStore] = None,
+    ):
         self.cache = {}
-    
+        self.bar_store = bar_store or default_bar_store
+        self.indicator_states = indicator_states or default_indicator_states
+
     def get_stock_info(self, symbol: str) -> dict:
         """
         Hämtar aktuell info för en aktie.
@@ -29,40 +55,247 @@ class StockDataFetcher:
         Returns:
             Dict med kursinformation
         """
+        return self.get_stock_infos([symbol])[symbol]
+
+    def get_stock_infos(self, symbols: List[str], max_age: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Hämtar aktuell info för många aktier på en gång.
+
+        Kurserna hämtas med en (eller ett fåtal) bulk-nedladdningar och
+        förändring/volymkvot räknas ut för alla symboler i ett pandas-pass.
+
+        Args:
+            symbols: Lista med aktiesymboler
+            max_age: Max ålder i sekunder på lagrade bars (standard SYNC_INTERVAL)
+
+        Returns:
+            Dict symbol -> samma dict som get_stock_info returnerar
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            hist = ticker.history(period="5d")
-            
-            if hist.empty:
-                return {"error": f"Ingen data hittades för {symbol}"}
-            
-            current_price = hist['Close'].iloc[-1]
-            prev_close = hist['Close'].iloc[-2] if len(hist) > 1 else current_price
-            change_pct = ((current_price - prev_close) / prev_close) * 100
-            
-            # Volymanalys
-            current_volume = hist['Volume'].iloc[-1]
-            avg_volume = hist['Volume'].mean()
-            volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1
-            
-            return {
+            self.sync_bars(symbols, max_age)
+            tails = {s: self.bar_store.tail(s, 5) for s in symbols}
+            close = pd.DataFrame({s: t["Close"] for s, t in tails.items()})
+            volume = pd.DataFrame({s: t["Volume"] for s, t in tails.items()})
+            quotes = self._summarize_quotes(close, volume)
+        except Exception as e:
+            return {s: {"error": str(e), "symbol": s} for s in symbols}
+
+        # Namn, 52v high/low, börsvärde och valuta kommer från den dagliga
+        # referensdatacachen - ticker.info anropas aldrig på kursvägen
+        references = reference_data.get_many([s for s in symbols if s in quotes.index])
+        timestamp = datetime.now().isoformat()
+
+        results = {}
+        for symbol in symbols:
+            if symbol not in quotes.index:
+                results[symbol] = {"error": f"Ingen data hittades för {symbol}"}
+                continue
+
+            row = quotes.loc[symbol]
+            ref = references[symbol]
+            results[symbol] = {
                 "symbol": symbol,
-                "name": info.get("shortName", symbol),
-                "current_price": round(current_price, 2),
-                "change_percent": round(change_pct, 2),
-                "volume": int(current_volume),
-                "volume_vs_avg": round(volume_ratio, 2),
-                "high_52w": info.get("fiftyTwoWeekHigh"),
-                "low_52w": info.get("fiftyTwoWeekLow"),
-                "market_cap": info.get("marketCap"),
-                "currency": info.get("currency", "SEK"),
-                "timestamp": datetime.now().isoformat()
+                "name": ref["name"],
+                "current_price": round(float(row["current_price"]), 2),
+                "change_percent": round(float(row["change_percent"]), 2),
+                "volume": int(row["volume"]),
+                "volume_vs_avg": round(float(row["volume_vs_avg"]), 2),
+                "high_52w": ref["high_52w"],
+                "low_52w": ref["low_52w"],
+                "market_cap": ref["market_cap"],
+                "currency": ref["currency"],
+                "timestamp": timestamp
             }
-            
-        except Exception as e:
-            return {"error": str(e), "symbol": symbol}
-    
+
+        return results
+
+    def sync_bars(self, symbols: List[str], max_age: Optional[float] = None):
+        """
+        Hämtar bars som saknas i bar-lagret sedan senast lagrade tidpunkt.
+
+        Hämtningen börjar vid näst sista lagrade bar: den sista kan vara
+        ofullständig och den näst sista jämförs för att upptäcka splittar och
+        utdelningar som justerat om historiken (se _download_into_store).
+        Symboler som synkats inom max_age (standard SYNC_INTERVAL) hoppas över,
+        liksom symboler vars börs är stängd och som synkats efter stängning.
+        """
+        if max_age is None:
+            max_age = self.SYNC_INTERVAL
+        stale = [
+            s for s in dict.fromkeys(symbols)
+            if not self.bar_store.is_fresh(s, max_age) and not self._closed_and_synced(s)
+        ]
+        if not stale:
+            return
+
+        # Symboler som en annan tråd redan synkar väntar vi in i stället för att hämta igen
+        mine, waiting = _sync_flight.claim(stale)
+        try:
+            self._sync_stale(mine)
+        except BaseException as e:
+            _sync_flight.resolve(mine, error=e)
+            raise
+        _sync_flight.resolve(mine)
+        for future in waiting:
+            future.result()
+
+    def _sync_stale(self, symbols: List[str]):
+        """Laddar ner nya bars för symboler som denna tråd har tagit på sig."""
+        if not symbols:
+            return
+
+        # Gruppera på startdatum så att hela universumet oftast blir en nedladdning
+        groups = {}
+        for symbol in symbols:
+            resync = self.bar_store.resync_from(symbol)
+            start = resync.strftime("%Y-%m-%d") if resync is not None else None
+            groups.setdefault(start, []).append(symbol)
+
+        for start, group in groups.items():
+            if start:
+                self._download_into_store(group, check_adjustment=True, start=start)
+            else:
+                self._download_into_store(group, period=self.INITIAL_PERIOD)
+
+        self.bar_store.mark_synced(symbols)
+
+    def _closed_and_synced(self, symbol: str) -> bool:
+        """True om börsen är stängd och symbolen synkats sedan senaste stängning."""
+        calendar = calendar_for(symbol)
+        return not calendar.is_active() and self.bar_store.synced_after(symbol, calendar.last_settled())
+
+    def _download_into_store(self, symbols: List[str], check_adjustment: bool = False, **kwargs):
+        """
+        Laddar ner bars och slår ihop dem med bar-lagret.
+
+        Med check_adjustment jämförs överlappande, redan lagrade bars med de
+        nedladdade. Skiljer de sig har Yahoo justerat om historiken (split
+        eller utdelning) och symbolens hela historik hämtas om.
+        """
+        panel = self._download(symbols, **kwargs)
+        readjusted = []
+        for symbol in symbols:
+            frame = pd.DataFrame({field: panel[field][symbol] for field in panel})
+            if check_adjustment and self.bar_store.adjustment_changed(symbol, frame):
+                readjusted.append(symbol)
+            else:
+                self.bar_store.merge(symbol, frame)
+        if readjusted:
+            self._rebuild_bars(readjusted)
+
+    def _rebuild_bars(self, symbols: List[str]):
+        """Hämtar om hela den lagrade historiken för omjusterade symboler."""
+        print(f"Justerad historik (split/utdelning), hämtar om: {', '.join(symbols)}")
+        groups = {}
+        for symbol in symbols:
+            first = self.bar_store.first_time(symbol)
+            groups.setdefault(first.strftime("%Y-%m-%d"), []).append(symbol)
+
+        for start, group in groups.items():
+            panel = self._download(group, start=start)
+            for symbol in group:
+                frame = pd.DataFrame({field: panel[field][symbol] for field in panel})
+                # Under symbolens lås, så att ingen teknisk analys matar nya
+                # bars in i ett tillstånd med den gamla justeringen
+                with self.indicator_states.lock(symbol):
+                    self.bar_store.replace(symbol, frame)
+                    # Indikatortillståndet bygger på den gamla justeringen
+                    self.indicator_states.discard(symbol)
+
+    def _download(self, symbols: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        Bulk-hämtar OHLCV för flera symboler.
+
+        Returns:
+            Dict fält ("Open", "High", ...) -> bred DataFrame (datum × symbol)
+        """
+        frames = []
+        for i in range(0, len(symbols), self.BULK_CHUNK_SIZE):
+            chunk = symbols[i:i + self.BULK_CHUNK_SIZE]
+            data = self._download_chunk(chunk, partial=True, **kwargs)
+            if yahoo.last_throttled:
+                # Behåll det som kom och hämta bara om symbolerna som saknas
+                missing = chunk if data is None else self._missing_symbols(data, chunk)
+                if missing:
+                    print(f"Yahoo strypte {len(missing)} av {len(chunk)} symboler, hämtar om dem")
+                    if data is not None:
+                        data = data.drop(columns=missing, level=1, errors="ignore")
+                    frames.append(self._download_chunk(missing, **kwargs))
+            frames.append(data)
+        frames = [f for f in frames if f is not None and not f.empty]
+
+        fields = ["Open", "High", "Low", "Close", "Volume"]
+        if not frames:
+            return {f: pd.DataFrame(columns=symbols, dtype=float) for f in fields}
+
+        data = pd.concat(frames, axis=1).sort_index()
+        return {f: data[f].reindex(columns=symbols) for f in fields}
+
+    @staticmethod
+    def _download_chunk(chunk: List[str], partial: bool = False, **kwargs) -> Optional[pd.DataFrame]:
+        """En bulk-hämtning med kolumner (fält, symbol), eller None."""
+        # Går via den gemensamma Yahoo-gatewayen (en token per symbol).
+        # threads=False: yfinance får inte starta egna trådar förbi
+        # gatewayens samtidighetsgräns, och throttling-loggar hamnar då
+        # på anropets egen tråd.
+        data = yahoo.call(
+            yf.download,
+            chunk,
+            cost=len(chunk),
+            partial=partial,
+            auto_adjust=True,
+            group_by="column",
+            progress=False,
+            threads=False,
+            **kwargs
+        )
+        if data is None or data.empty:
+            return None
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, chunk])
+        return data
+
+    @staticmethod
+    def _missing_symbols(data: pd.DataFrame, chunk: List[str]) -> List[str]:
+        """Symboler i `chunk` utan en enda stängningskurs i `data`."""
+        close = data["Close"] if "Close" in data.columns.get_level_values(0) else pd.DataFrame()
+        return [s for s in chunk if s not in close.columns or close[s].isna().all()]
+
+    @staticmethod
+    def _summarize_quotes(close: pd.DataFrame, volume: pd.DataFrame) -> pd.DataFrame:
+        """
+        Räknar ut kurs, dagsförändring och volymkvot för alla symboler.
+
+        Varje kolumn behandlas som sin egen serie utan tomma rader, precis
+        som ticker.history() per symbol, så att t.ex. svenska och amerikanska
+        helgdagar inte ger falska nollförändringar.
+        """
+        valid = close.notna()
+        # Antal giltiga rader från och med varje rad till slutet
+        from_end = valid.iloc[::-1].cumsum().iloc[::-1]
+        last = valid & (from_end == 1)
+        prev = valid & (from_end == 2)
+
+        current_price = close.where(last).max()
+        prev_close = close.where(prev).max().fillna(current_price)
+        change_pct = (current_price - prev_close) / prev_close * 100
+
+        current_volume = volume.where(last).max().fillna(0)
+        avg_volume = volume.where(valid).mean()
+        volume_ratio = (current_volume / avg_volume).where(avg_volume > 0, 1.0)
+
+        summary = pd.DataFrame({
+            "current_price": current_price,
+            "change_percent": change_pct,
+            "volume": current_volume,
+            "volume_vs_avg": volume_ratio,
+        })
+        return summary[summary["current_price"].notna()]
+
     def get_price_history(self, symbol: str, days: int = 30) -> pd.DataFrame:
         """
         Hämtar prishistorik för teknisk analys.
@@ -74,17 +307,34 @@ class StockDataFetcher:
         Returns:
             DataFrame med OHLCV-data
         """
+        return self.get_price_histories([symbol], days)[symbol]
+
+    def get_price_histories(self, symbols: List[str], days: int = 30) -> Dict[str, pd.DataFrame]:
+        """
+        Hämtar prishistorik för många aktier på en gång.
+
+        Symboler vars lagrade historik inte räcker bakåt fylls på med en
+        gemensam bulk-nedladdning.
+
+        Returns:
+            Dict symbol -> DataFrame med OHLCV-data (tom vid fel)
+        """
+        symbols = list(dict.fromkeys(symbols))
         try:
-            ticker = yf.Ticker(symbol)
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
-            
-            hist = ticker.history(start=start_date, end=end_date)
-            return hist
-            
+
+            self.sync_bars(symbols)
+            uncovered = [s for s in symbols if not self.bar_store.covers(s, start_date)]
+            if uncovered:
+                self._download_into_store(uncovered, start=start_date.strftime("%Y-%m-%d"))
+                for symbol in uncovered:
+                    self.bar_store.mark_covered(symbol, start_date)
+            return {s: self.bar_store.window(s, start_date, end_date) for s in symbols}
+
         except Exception as e:
-            print(f"Fel vid hämtning av historik för {symbol}: {e}")
-            return pd.DataFrame()
+            print(f"Fel vid hämtning av historik för {', '.join(symbols)}: {e}")
+            return {s: pd.DataFrame() for s in symbols}
     
     def get_technical_analysis(self, symbol: str) -> dict:
         """
@@ -93,160 +343,100 @@ class StockDataFetcher:
         Returns:
             Dict med RSI, stöd/motstånd, entry/stoploss/target
         """
-        try:
-            ticker = yf.Ticker(symbol)
-            # Använd 3 månader för att säkerställa tillräckligt med data
-            hist = ticker.history(period="3mo")
-
-            if hist.empty or len(hist) < 20:
-                return {"error": f"För lite data för {symbol} ({len(hist)} rader)"}
-
-            close = hist['Close'].dropna()
-            high = hist['High'].dropna()
-            low = hist['Low'].dropna()
-            volume = hist['Volume'].dropna()
-
-            if len(close) < 20:
-                return {"error": f"För lite prisdata för {symbol}"}
-
-            current_price = float(close.iloc[-1])
-
-            # === RSI (14 perioder) ===
-            delta = close.diff()
-            gain = delta.where(delta > 0, 0).rolling(window=14, min_periods=14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=14).mean()
-
-            # Undvik division med noll
-            rs = gain / loss.replace(0, 0.0001)
-            rsi = 100 - (100 / (1 + rs))
-
-            # Hämta senaste RSI-värdet, hantera NaN
-            current_rsi = rsi.iloc[-1]
-            if pd.isna(current_rsi):
-                # Fallback: beräkna enklare RSI på senaste 14 dagarna
-                recent = close.tail(15).diff().dropna()
-                gains = recent[recent > 0].sum()
-                losses = abs(recent[recent < 0].sum())
-                if losses > 0:
-                    current_rsi = 100 - (100 / (1 + gains / losses))
-                else:
-                    current_rsi = 70  # Default om ingen förlust
-
-            # === Stöd och Motstånd (senaste 20 dagar) ===
-            recent_high = high.tail(20).max()
-            recent_low = low.tail(20).min()
-
-            # Hitta lokala toppar/bottnar för bättre nivåer
-            resistance_levels = []
-            support_levels = []
-
-            for i in range(2, len(high) - 2):
-                # Lokal topp
-                if high.iloc[i] > high.iloc[i-1] and high.iloc[i] > high.iloc[i+1]:
-                    resistance_levels.append(high.iloc[i])
-                # Lokal botten
-                if low.iloc[i] < low.iloc[i-1] and low.iloc[i] < low.iloc[i+1]:
-                    support_levels.append(low.iloc[i])
-
-            # Närmaste motstånd över current price
-            resistance = float(min([r for r in resistance_levels if r > current_price], default=recent_high))
-            # Närmaste stöd under current price
-            support = float(max([s for s in support_levels if s < current_price], default=recent_low))
-
-            # === Volymanalys ===
-            avg_volume = float(volume.tail(20).mean())
-            current_volume = float(volume.iloc[-1])
-            volume_spike = current_volume / avg_volume if avg_volume > 0 else 1.0
-
-            # === ATR (Average True Range) för volatilitet ===
-            tr1 = high - low
-            tr2 = abs(high - close.shift())
-            tr3 = abs(low - close.shift())
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = float(tr.rolling(window=14).mean().iloc[-1])
-
-            # Fallback om ATR är NaN
-            if pd.isna(atr) or atr <= 0:
-                atr = current_price * 0.02  # 2% som fallback
-
-            # === Entry, Stoploss, Target för daytrading ===
-            entry_price = round(current_price, 2)
-
-            # Stoploss: 2x ATR under entry, eller strax under support
-            atr_stop = current_price - (2 * atr)
-            support_stop = float(support) * 0.99
-            stoploss = round(max(atr_stop, support_stop), 2)
-
-            # Target: 3x risk (risk/reward 1:3) eller motstånd
-            risk = current_price - stoploss
-            atr_target = current_price + (3 * risk)
-            target = round(min(atr_target, resistance * 0.99), 2)  # 1% under resistance
-
-            # Garantera rimliga nivåer
-            if stoploss >= current_price:
-                stoploss = round(current_price * 0.96, 2)  # -4% fallback
-            if target <= current_price:
-                target = round(current_price * 1.05, 2)  # +5% fallback
-
-            # === Beräkna procent ===
-            stoploss_pct = round(((stoploss - current_price) / current_price) * 100, 1)
-            target_pct = round(((target - current_price) / current_price) * 100, 1)
-
-            # === Tekniska signaler ===
-            signals = []
-
-            if current_rsi < 30:
-                signals.append("RSI översåld (<30) - potential för studs")
-            elif current_rsi > 70:
-                signals.append("RSI överköpt (>70) - varning")
-            elif 40 <= current_rsi <= 60:
-                signals.append(f"RSI neutral ({current_rsi:.0f})")
-
-            if volume_spike > 1.5:
-                signals.append(f"Volymspike: {volume_spike:.1f}x genomsnitt")
-
-            if current_price > resistance * 0.98:
-                signals.append(f"Testar motstånd vid {resistance:.2f}")
-
-            if current_price < support * 1.02:
-                signals.append(f"Nära stöd vid {support:.2f}")
-
-            # Trend (enkel: över/under 20-dagars MA)
-            ma20 = close.tail(20).mean()
-            if current_price > ma20:
-                signals.append("Över 20-dagars MA (upptrend)")
-            else:
-                signals.append("Under 20-dagars MA (nedtrend)")
+        return self.get_technical_analyses([symbol])[symbol]
 
-            return {
-                "symbol": symbol,
-                "current_price": round(current_price, 2),
-                "rsi": round(current_rsi, 1),
-                "support": round(support, 2),
-                "resistance": round(resistance, 2),
-                "atr": round(atr, 2),
-                "volume_spike": round(volume_spike, 2),
-                "entry_price": entry_price,
-                "stoploss": stoploss,
-                "stoploss_pct": stoploss_pct,
-                "target": target,
-                "target_pct": target_pct,
-                "signals": signals,
-                "ma20": round(ma20, 2),
-                "trend": "up" if current_price > ma20 else "down"
-            }
+    def get_technical_analyses(self, symbols: List[str]) -> Dict[str, dict]:
+        """
+        Beräknar tekniska indikatorer för många aktier på en gång.
+
+        Symboler med sparat indikatortillstånd uppdateras inkrementellt med
+        bara de bars som tillkommit sedan sist (O(1) per bar). Övriga läses
+        från bar-lagret till en bred panel, räknas vektoriserat (se
+        indicators.compute_technicals) och får ett tillstånd för nästa gång.
+
+        Returns:
+            Dict symbol -> samma dict som get_technical_analysis
+        """
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
 
+        try:
+            # Använd 3 månader för att säkerställa tillräckligt med data
+            self.sync_bars(symbols)
+            start = pd.Timestamp.now().normalize() - pd.DateOffset(months=3)
+
+            results = {}
+            cold = []
+            for symbol in symbols:
+                # Tillstånden delas mellan anrop; en symbol i taget per tillstånd
+                with self.indicator_states.lock(symbol):
+                    try:
+                        state = self._advance_state(symbol)
+                        if state is not None:
+                            results[symbol] = state.result(symbol, start)
+                    except Exception as e:
+                        print(f"Fel i indikatortillstånd för {symbol}, bygger om: {e}")
+                        self.indicator_states.discard(symbol)
+                        state = None
+                if state is None:
+                    cold.append(symbol)
+
+            if cold:
+                windows = {s: self.bar_store.window(s, start=start) for s in cold}
+                panel = {
+                    field: pd.DataFrame({s: w[field] for s, w in windows.items()}, columns=cold)
+                    for field in ["Open", "High", "Low", "Close", "Volume"]
+                }
+                results.update(compute_technicals(panel))
+                for symbol, window in windows.items():
+                    if not window.empty:
+                        self.indicator_states.put(symbol, IndicatorState.from_bars(window))
+
+            self.indicator_states.flush()
+            return {s: results[s] for s in symbols}
         except Exception as e:
-            return {"error": str(e), "symbol": symbol}
+            return {s: {"error": str(e), "symbol": s} for s in symbols}
 
-    def check_unusual_activity(self, symbol: str) -> dict:
+    def _advance_state(self, symbol: str) -> Optional[IndicatorState]:
+        """
+        Matar sparat indikatortillstånd med nya bars från bar-lagret.
+
+        Returns:
+            Uppdaterat tillstånd, eller None om det saknas eller måste byggas om
+        """
+        state = self.indicator_states.get(symbol, IndicatorState.from_dict)
+        if state is None or state.last_time is None:
+            return None
+
+        bars = self.bar_store.read(symbol)
+        i = int(np.searchsorted(bars["time"], state.last_time))
+        if i == len(bars) or int(bars["time"][i]) != state.last_time:
+            # Senaste bar i tillståndet finns inte längre i lagret
+            self.indicator_states.discard(symbol)
+            return None
+
+        for bar in bars[i:].tolist():
+            t, _, h, l, c, v = bar
+            if not state.update(t, h, l, c, v):
+                self.indicator_states.discard(symbol)
+                return None
+        self.indicator_states.put(symbol, state)
+        return state
+
+    def check_unusual_activity(self, symbol: str, info: Optional[dict] = None) -> dict:
         """
         Kontrollerar om det finns ovanlig aktivitet (volym/prisrörelse).
+
+        Args:
+            symbol: Aktiesymbol
+            info: Redan hämtad kursinfo (från get_stock_info/get_stock_infos)
         
         Returns:
             Dict med flaggor för ovanlig aktivitet
         """
-        info = self.get_stock_info(symbol)
+        if info is None:
+            info = self.get_stock_info(symbol)
         
         if "error" in info:
             return info
@@ -0,0 +1,232 @@
+"""
+Benchmark: per-symbol technical analysis vs the vectorised engine.
+
+Builds a synthetic 3-month random-walk panel and times the legacy
+one-symbol-at-a-time implementation (kept here as the reference) against
+agents.indicators.compute_technicals at 170 and 5,000 symbols. Every
+symbol's result is also compared against the reference.
+
+Run from backend/:  python -m benchmarks.bench_indicators
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.indicators import compute_technicals
+
+
+def legacy_technical_analysis(symbol: str, hist: pd.DataFrame) -> dict:
+    """The original StockDataFetcher.get_technical_analysis, minus the download."""
+    try:
+        if hist.empty or len(hist) < 20:
+            return {"error": f"För lite data för {symbol} ({len(hist)} rader)"}
+
+        close = hist['Close'].dropna()
+        high = hist['High'].dropna()
+        low = hist['Low'].dropna()
+        volume = hist['Volume'].dropna()
+
+        if len(close) < 20:
+            return {"error": f"För lite prisdata för {symbol}"}
+
+        current_price = float(close.iloc[-1])
+
+        # === RSI (14 perioder) ===
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(window=14, min_periods=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=14).mean()
+
+        # Undvik division med noll
+        rs = gain / loss.replace(0, 0.0001)
+        rsi = 100 - (100 / (1 + rs))
+
+        # Hämta senaste RSI-värdet, hantera NaN
+        current_rsi = rsi.iloc[-1]
+        if pd.isna(current_rsi):
+            # Fallback: beräkna enklare RSI på senaste 14 dagarna
+            recent = close.tail(15).diff().dropna()
+            gains = recent[recent > 0].sum()
+            losses = abs(recent[recent < 0].sum())
+            if losses > 0:
+                current_rsi = 100 - (100 / (1 + gains / losses))
+            else:
+                current_rsi = 70  # Default om ingen förlust
+
+        # === Stöd och Motstånd (senaste 20 dagar) ===
+        recent_high = high.tail(20).max()
+        recent_low = low.tail(20).min()
+
+        # Hitta lokala toppar/bottnar för bättre nivåer
+        resistance_levels = []
+        support_levels = []
+
+        for i in range(2, len(high) - 2):
+            # Lokal topp
+            if high.iloc[i] > high.iloc[i-1] and high.iloc[i] > high.iloc[i+1]:
+                resistance_levels.append(high.iloc[i])
+            # Lokal botten
+            if low.iloc[i] < low.iloc[i-1] and low.iloc[i] < low.iloc[i+1]:
+                support_levels.append(low.iloc[i])
+
+        # Närmaste motstånd över current price
+        resistance = float(min([r for r in resistance_levels if r > current_price], default=recent_high))
+        # Närmaste stöd under current price
+        support = float(max([s for s in support_levels if s < current_price], default=recent_low))
+
+        # === Volymanalys ===
+        avg_volume = float(volume.tail(20).mean())
+        current_volume = float(volume.iloc[-1])
+        volume_spike = current_volume / avg_volume if avg_volume > 0 else 1.0
+
+        # === ATR (Average True Range) för volatilitet ===
+        tr1 = high - low
+        tr2 = abs(high - close.shift())
+        tr3 = abs(low - close.shift())
+        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        atr = float(tr.rolling(window=14).mean().iloc[-1])
+
+        # Fallback om ATR är NaN
+        if pd.isna(atr) or atr <= 0:
+            atr = current_price * 0.02  # 2% som fallback
+
+        # === Entry, Stoploss, Target för daytrading ===
+        entry_price = round(current_price, 2)
+
+        # Stoploss: 2x ATR under entry, eller strax under support
+        atr_stop = current_price - (2 * atr)
+        support_stop = float(support) * 0.99
+        stoploss = round(max(atr_stop, support_stop), 2)
+
+        # Target: 3x risk (risk/reward 1:3) eller motstånd
+        risk = current_price - stoploss
+        atr_target = current_price + (3 * risk)
+        target = round(min(atr_target, resistance * 0.99), 2)  # 1% under resistance
+
+        # Garantera rimliga nivåer
+        if stoploss >= current_price:
+            stoploss = round(current_price * 0.96, 2)  # -4% fallback
+        if target <= current_price:
+            target = round(current_price * 1.05, 2)  # +5% fallback
+
+        # === Beräkna procent ===
+        stoploss_pct = round(((stoploss - current_price) / current_price) * 100, 1)
+        target_pct = round(((target - current_price) / current_price) * 100, 1)
+
+        # === Tekniska signaler ===
+        signals = []
+
+        if current_rsi < 30:
+            signals.append("RSI översåld (<30) - potential för studs")
+        elif current_rsi > 70:
+            signals.append("RSI överköpt (>70) - varning")
+        elif 40 <= current_rsi <= 60:
+            signals.append(f"RSI neutral ({current_rsi:.0f})")
+
+        if volume_spike > 1.5:
+            signals.append(f"Volymspike: {volume_spike:.1f}x genomsnitt")
+
+        if current_price > resistance * 0.98:
+            signals.append(f"Testar motstånd vid {resistance:.2f}")
+
+        if current_price < support * 1.02:
+            signals.append(f"Nära stöd vid {support:.2f}")
+
+        # Trend (enkel: över/under 20-dagars MA)
+        ma20 = close.tail(20).mean()
+        if current_price > ma20:
+            signals.append("Över 20-dagars MA (upptrend)")
+        else:
+            signals.append("Under 20-dagars MA (nedtrend)")
+
+        return {
+            "symbol": symbol,
+            "current_price": round(current_price, 2),
+            "rsi": round(current_rsi, 1),
+            "support": round(support, 2),
+            "resistance": round(resistance, 2),
+            "atr": round(atr, 2),
+            "volume_spike": round(volume_spike, 2),
+            "entry_price": entry_price,
+            "stoploss": stoploss,
+            "stoploss_pct": stoploss_pct,
+            "target": target,
+            "target_pct": target_pct,
+            "signals": signals,
+            "ma20": round(ma20, 2),
+            "trend": "up" if current_price > ma20 else "down"
+        }
+
+    except Exception as e:
+        return {"error": str(e), "symbol": symbol}
+
+
+def make_panel(n_symbols: int, n_days: int = 63, seed: int = 0) -> dict:
+    """Random-walk OHLCV panel with a few gaps, like mixed SE/US holidays."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp("2026-10-16"), periods=n_days)
+    columns = [f"SYM{i}" for i in range(n_symbols)]
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (n_days, n_symbols))) * close
+    high = close + spread
+    low = close - spread
+    open_ = close + rng.normal(0, 0.005, (n_days, n_symbols)) * close
+    volume = rng.integers(1_000, 1_000_000, (n_days, n_symbols)).astype(float)
+
+    # Every 7th symbol misses a handful of days; every 50th is too short
+    gaps = np.zeros((n_days, n_symbols), dtype=bool)
+    gaps[rng.integers(0, n_days, 5)[:, None], np.arange(0, n_symbols, 7)] = True
+    gaps[: n_days - 15, np.arange(0, n_symbols, 50)] = True
+
+    panel = {}
+    for field, values in [("Open", open_), ("High", high), ("Low", low), ("Close", close), ("Volume", volume)]:
+        values = np.where(gaps, np.nan, values)
+        panel[field] = pd.DataFrame(values, index=index, columns=columns)
+    return panel
+
+
+def run_legacy(panel: dict) -> dict:
+    results = {}
+    for symbol in panel["Close"].columns:
+        hist = pd.DataFrame({field: frame[symbol] for field, frame in panel.items()})
+        hist = hist.dropna(subset=["Close"])
+        results[symbol] = legacy_technical_analysis(symbol, hist)
+    return results
+
+
+def bench(n_symbols: int, repeat: int = 3):
+    panel = make_panel(n_symbols)
+
+    start = time.perf_counter()
+    legacy = run_legacy(panel)
+    legacy_time = time.perf_counter() - start
+
+    vector_time = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vector = compute_technicals(panel)
+        vector_time = min(vector_time, time.perf_counter() - start)
+
+    mismatches = [s for s in legacy if legacy[s] != vector[s]]
+    print(
+        f"{n_symbols:>6} symbols: legacy {legacy_time * 1000:9.1f} ms | "
+        f"vectorised {vector_time * 1000:7.1f} ms | "
+        f"speed-up {legacy_time / vector_time:6.1f}x | "
+        f"mismatches {len(mismatches)}"
+    )
+    for symbol in mismatches[:3]:
+        print(f"  {symbol}: {legacy[symbol]} != {vector[symbol]}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    failed = False
+    for n in (170, 5000):
+        failed |= bool(bench(n))
+    sys.exit(1 if failed else 0)
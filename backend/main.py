@@ -13,13 +13,29 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Ensure backend directory is in path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from routers import stocks, news, congress, briefings, climate
-from services.scheduler import setup_scheduler, shutdown_scheduler
+from routers import stocks, news, congress, briefings, climate, admin
+from services.scheduler import setup_scheduler, shutdown_scheduler, warm_quotes
 from services.db import init_db
+from services.indicator_state import indicator_states
+from services.warmup import warmup
+
+
+def _register_warmup():
+    """Warm the hot paths in priority order (critical steps gate /ready)."""
+    warmup.add("quotes", warm_quotes, critical=True)
+    warmup.add("indices", climate._get_indices, critical=True)
+    warmup.add("climate_signals", climate._get_signals, critical=True)
+    warmup.add("news", news._get_all_news)
+    warmup.add("congress", lambda: (
+        congress._get_recent_trades(30, "$1,001 -"),
+        congress._get_congress_stats(30),
+    ))
+    warmup.add("di_calendar", climate._get_events)
 
 
 @asynccontextmanager
@@ -27,8 +43,11 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     init_db()
     setup_scheduler()
+    _register_warmup()
+    warmup.start()
     yield
     shutdown_scheduler()
+    indicator_states.flush(force=True)
 
 
 app = FastAPI(
@@ -64,6 +83,7 @@ app.include_router(news.router, prefix="/api/news", tags=["Nyheter"])
 app.include_router(congress.router, prefix="/api/congress", tags=["Kongresshandel"])
 app.include_router(briefings.router, prefix="/api/briefings", tags=["Briefingar"])
 app.include_router(climate.router, prefix="/api/climate", tags=["Aktieklimat"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/")
@@ -73,3 +93,10 @@ def root():
         "version": "2.0.0",
         "docs": "/docs",
     }
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the critical warm-up steps have finished."""
+    progress = warmup.progress()
+    return JSONResponse(progress, status_code=200 if progress["ready"] else 503)
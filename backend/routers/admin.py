@@ -0,0 +1,113 @@
+"""
+Admin API routes: response-cache statistics and invalidation.
+
+Every request must send ADMIN_TOKEN in the X-Admin-Token header. Without
+ADMIN_TOKEN set, the admin API is disabled and every route returns 404.
+"""
+
+import glob
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from agents.snapshot import discard_snapshot
+from services.bar_store import bar_store
+from services.cache import get_namespace, namespaces
+from services.indicator_state import indicator_states
+from services.quote_store import quote_store
+
+router = APIRouter()
+
+_admin_token = os.environ.get("ADMIN_TOKEN")
+
+
+def _require_token(x_admin_token: Optional[str] = Header(None)):
+    if not _admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), _admin_token.encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def _namespace_or_404(name: str):
+    ns = get_namespace(name)
+    if ns is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cache namespace: {name}")
+    return ns
+
+
+@router.get("/cache", dependencies=[Depends(_require_token)])
+def get_cache_overview():
+    """
+    Per-namespace size, hit ratio, memory estimate and entry-age histogram,
+    plus totals across all namespaces.
+    """
+    described = {ns.name: ns.describe() for ns in namespaces()}
+    hits = sum(n["hits"] for n in described.values())
+    lookups = hits + sum(n["misses"] for n in described.values())
+    return {
+        "namespaces": described,
+        "totals": {
+            "entries": sum(n["entries"] for n in described.values()),
+            "memory_bytes": sum(n["memory_bytes"] for n in described.values()),
+            "hits": hits,
+            "coalesced": sum(n["coalesced"] for n in described.values()),
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        },
+    }
+
+
+@router.get("/cache/{name}", dependencies=[Depends(_require_token)])
+def get_cache_namespace(name: str, keys: int = 50):
+    """One namespace in detail, including its most recently used keys."""
+    return {"namespace": name, **_namespace_or_404(name).describe(keys=max(0, min(keys, 1000)))}
+
+
+@router.delete("/cache", dependencies=[Depends(_require_token)])
+def invalidate_cache(pattern: Optional[str] = None):
+    """
+    Invalidate every namespace, or only keys matching a glob `pattern`.
+
+    This only clears cached responses; use DELETE /symbols/{symbol} to also
+    drop a symbol's stored bars, indicator state, quote and snapshot.
+    """
+    removed = {}
+    for ns in namespaces():
+        removed[ns.name] = ns.invalidate_matching(pattern) if pattern else ns.invalidate()
+    return {"removed": removed, "total": sum(removed.values())}
+
+
+@router.delete("/cache/{name}", dependencies=[Depends(_require_token)])
+def invalidate_cache_namespace(name: str, pattern: Optional[str] = None):
+    """Invalidate one namespace, or only its keys matching a glob `pattern`."""
+    ns = _namespace_or_404(name)
+    removed = ns.invalidate_matching(pattern) if pattern else ns.invalidate()
+    return {"namespace": name, "removed": removed}
+
+
+@router.delete("/symbols/{symbol}", dependencies=[Depends(_require_token)])
+def invalidate_symbol(symbol: str):
+    """
+    Drop everything derived for one symbol (e.g. VOLV-B.ST after a corporate
+    action): cached responses whose key mentions it, stored bars, indicator
+    state, the current quote (also in the shared cache) and the shared
+    snapshot. Each is rebuilt from upstream on its next use. Dropping the
+    quote is a quote change, so the ranking, top movers and their ETags and
+    the quote stream update too.
+    """
+    symbol = symbol.upper()
+    pattern = f"*{glob.escape(symbol)}*"
+    removed = {}
+    for ns in namespaces():
+        count = ns.invalidate_matching(pattern)
+        if count:
+            removed[ns.name] = count
+    with indicator_states.lock(symbol):
+        indicator_states.discard(symbol)
+    bar_store.discard(symbol)
+    quote_store.invalidate(symbol)
+    discard_snapshot(symbol)
+    return {"symbol": symbol, "cache_entries_removed": removed}
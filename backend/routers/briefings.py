@@ -2,33 +2,39 @@
 Briefing API routes.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
+from services.response_cache import responses
 from services.scheduler import get_briefing, get_briefing_history, get_rockets_history, get_investment_simulation
 
 router = APIRouter()
 
 
+def _briefing_response(request: Request, key: str, briefing: dict):
+    """Stored briefings are reused as-is, so the same object means the same bytes."""
+    return responses.respond(request, ("briefing", key), (briefing,), lambda: briefing)
+
+
 @router.get("/morning")
-def get_morning_briefing():
+def get_morning_briefing(request: Request):
     """Get the latest morning briefing (08:15 CET)."""
-    return get_briefing("morning")
+    return _briefing_response(request, "morning", get_briefing("morning"))
 
 
 @router.get("/evening")
-def get_evening_briefing():
+def get_evening_briefing(request: Request):
     """Get the latest evening briefing (17:15 CET)."""
-    return get_briefing("evening")
+    return _briefing_response(request, "evening", get_briefing("evening"))
 
 
 @router.get("/latest")
-def get_latest_briefing():
+def get_latest_briefing(request: Request):
     """Get the most recent briefing of any type."""
     history = get_briefing_history(limit=1)
     if history:
-        return history[0]
+        return _briefing_response(request, "latest", history[0])
     # Generate morning briefing on demand
-    return get_briefing("morning")
+    return _briefing_response(request, "latest", get_briefing("morning"))
 
 
 @router.get("/history")
@@ -71,16 +77,14 @@ def regenerate_briefing(briefing_type: str):
     if briefing_type not in ["morning", "evening"]:
         return {"error": "Invalid briefing type. Use 'morning' or 'evening'"}
 
-    from services.scheduler import _engine, _briefing_store
+    from services.scheduler import _engine, remember_briefing
 
     if not _engine:
         return {"error": "Briefing engine not initialized"}
 
     try:
         briefing = _engine.generate_briefing(briefing_type)
-        _briefing_store[briefing_type] = briefing
-        _briefing_store["history"].insert(0, briefing)
-        _briefing_store["history"] = _briefing_store["history"][:20]
+        remember_briefing(briefing_type, briefing)
 
         return {
             "success": True,
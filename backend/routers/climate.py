@@ -2,61 +2,57 @@
 Climate API routes - marknadsklimat och ekonomisk kalender.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from datetime import datetime
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import json
 
 from agents.climate_agent import ClimateAgent
 from agents.stock_data import StockDataFetcher
 from agents.research_agent import ResearchAgent
+from agents.snapshot import SymbolSnapshot
 from services.cache import ttl_cache
+from services.response_cache import responses
+from services.universe import universe
 
 router = APIRouter()
 
 _climate_agent = ClimateAgent()
 _stock_fetcher = StockDataFetcher()
 _config_path = str(Path(__file__).parent.parent / "config" / "config.json")
-_omx_path = Path(__file__).parent.parent / "config" / "omx_stockholm.json"
 
 
-def _load_omx_stocks() -> dict:
-    with open(_omx_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-@ttl_cache(seconds=300)
+@ttl_cache(seconds=300, markets=("XSTO", "XNYS"), persist=True)
 def _get_indices() -> list:
     return _climate_agent.get_all_indices()
 
 
-@ttl_cache(seconds=21600)
+@ttl_cache(seconds=21600, stale_while_revalidate=86400, persist=True)
 def _get_di_events() -> list:
-    """DI-scrape cachas 6 timmar."""
+    """DI-scrape cachas 6 timmar, därefter serveras gammal data medan den hämtas om."""
     return _climate_agent.scrape_di_calendar()
 
 
-@ttl_cache(seconds=3600)
+@ttl_cache(seconds=3600, persist=True)
 def _get_events() -> list:
     """Alla events ihopslagna, cachas 1 timme."""
     di_events = _get_di_events()
     return _climate_agent.get_all_events(di_events=di_events)
 
 
-@ttl_cache(seconds=300)
+@ttl_cache(seconds=300, stale_while_revalidate=1800, persist=True)
 def _get_signals() -> dict:
     """Hämtar signalfördelning från Large Cap aktier."""
-    omx_data = _load_omx_stocks()
-    stocks = omx_data.get("stocks", {}).get("large_cap", [])
+    stocks = universe.stocks("large")[:30]  # Begränsa till 30 för snabbhet
 
     agent = ResearchAgent(_config_path)
+    snapshots = agent.get_snapshots(stocks)
 
     analyses = []
     with ThreadPoolExecutor(max_workers=10) as executor:
         futures = {
-            executor.submit(_analyze_stock, agent, stock): stock
-            for stock in stocks[:30]  # Begränsa till 30 för snabbhet
+            executor.submit(_analyze_stock, agent, stock, snapshots.get(stock["symbol"])): stock
+            for stock in stocks
         }
         for future in as_completed(futures):
             try:
@@ -69,10 +65,10 @@ def _get_signals() -> dict:
     return _climate_agent.aggregate_internal_signals(analyses)
 
 
-def _analyze_stock(agent: ResearchAgent, stock: dict) -> dict:
+def _analyze_stock(agent: ResearchAgent, stock: dict, snapshot: SymbolSnapshot = None) -> dict:
     """Analysera en aktie med felhantering."""
     try:
-        return agent.analyze_stock(stock["symbol"], stock["name"])
+        return agent.analyze_stock(stock["symbol"], stock["name"], snapshot=snapshot)
     except Exception as e:
         return {
             "symbol": stock["symbol"],
@@ -83,18 +79,24 @@ def _analyze_stock(agent: ResearchAgent, stock: dict) -> dict:
 
 
 @router.get("/overview")
-def get_climate_overview():
+def get_climate_overview(request: Request):
     """Komplett marknadsklimat: index + signaler + events."""
     indices = _get_indices()
     signals = _get_signals()
     events = _get_events()
 
-    return {
-        "indices": indices,
-        "signals": signals,
-        "events": events,
-        "timestamp": datetime.now().isoformat(),
-    }
+    # Byggs bara om när någon av de cachade delarna har bytts ut
+    return responses.respond(
+        request,
+        "climate-overview",
+        (indices, signals, events),
+        lambda: {
+            "indices": indices,
+            "signals": signals,
+            "events": events,
+            "timestamp": datetime.now().isoformat(),
+        },
+    )
 
 
 @router.get("/indices")
@@ -2,28 +2,29 @@
 Congress trading API routes.
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from typing import Optional
 
 from agents.congress_trades import CongressTradesFetcher
 from services.cache import ttl_cache
+from services.response_cache import responses
 
 router = APIRouter()
 
 _congress_fetcher = CongressTradesFetcher()
 
 
-@ttl_cache(seconds=1800)
+@ttl_cache(seconds=1800, persist=True)
 def _get_congress_stats(days: int) -> dict:
     return _congress_fetcher.get_summary_stats(days)
 
 
-@ttl_cache(seconds=1800)
+@ttl_cache(seconds=1800, persist=True)
 def _get_recent_trades(days: int, min_amount: str) -> list:
     return _congress_fetcher.get_recent_trades(days, min_amount)
 
 
-@ttl_cache(seconds=1800)
+@ttl_cache(seconds=1800, persist=True)
 def _get_ticker_activity(ticker: str) -> dict:
     return _congress_fetcher.check_ticker_congress_activity(ticker)
 
@@ -36,9 +37,10 @@ def get_recent_trades(days: int = 30, min_amount: str = "$1,001 -"):
 
 
 @router.get("/stats")
-def get_stats(days: int = 30):
+def get_stats(request: Request, days: int = 30):
     """Get congress trading summary statistics."""
-    return _get_congress_stats(days)
+    stats = _get_congress_stats(days)
+    return responses.respond(request, ("congress-stats", days), (stats,), lambda: stats)
 
 
 @router.get("/ticker/{ticker}")
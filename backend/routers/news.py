@@ -15,32 +15,34 @@ _config_path = str(Path(__file__).parent.parent / "config" / "config.json")
 _news_fetcher = NewsFetcher(_config_path)
 
 
-@ttl_cache(seconds=600)
 def _get_all_news() -> list:
-    return _news_fetcher.fetch_all_news()
+    """The shared news corpus (refreshed at most every NewsCorpus.REFRESH_SECONDS)."""
+    return _news_fetcher.get_corpus()
 
 
-@ttl_cache(seconds=600)
+@ttl_cache(seconds=600, persist=True)
 def _get_news_summary(company: str, symbol: str) -> dict:
     return _news_fetcher.get_news_summary(company, symbol)
 
 
 @router.get("/feed")
 def get_news_feed(company: Optional[str] = None, symbol: Optional[str] = None):
-    """Get news articles, optionally filtered by company."""
-    articles = _get_all_news()
-
+    """
+    Get news articles, optionally filtered by company. Each article lists the
+    universe companies it mentions (`companies`, symbols).
+    """
     if company or symbol:
-        articles = _news_fetcher.filter_by_company(
-            articles,
-            company or "",
-            symbol
-        )
-        for article in articles:
-            text = article["title"] + " " + article.get("summary", "")
-            article["sentiment"] = _news_fetcher.analyze_sentiment(text)
-
-    return {"articles": articles[:20], "total": len(articles)}
+        articles = _news_fetcher.company_articles(company or "", symbol)
+        # Copies: the corpus articles are shared between requests
+        page = [
+            {**article, "sentiment": _news_fetcher.analyze_sentiment(article["title"] + " " + article.get("summary", ""))}
+            for article in _news_fetcher.tag_companies(articles[:20])
+        ]
+    else:
+        articles = _get_all_news()
+        page = _news_fetcher.tag_companies(articles[:20])
+
+    return {"articles": page, "total": len(articles)}
 
 
 @router.get("/{symbol}/sentiment")
@@ -2,63 +2,55 @@
 Stock data API routes.
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
+import asyncio
 import json
+import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from agents.stock_data import StockDataFetcher
 from agents.news_fetcher import NewsFetcher
 from agents.congress_trades import CongressTradesFetcher
 from agents.research_agent import ResearchAgent
-from services.cache import ttl_cache
+from services.history_format import (
+    ARROW_MEDIA_TYPE,
+    encode_arrow,
+    encode_msgpack,
+    history_columns,
+    history_records,
+    negotiate,
+)
+from services.quote_store import quote_store
+from services.ranking import ranking
+from services.response_cache import responses
+from services.top_movers import top_movers
+from services.universe import SEGMENTS, universe
 
 router = APIRouter()
 
 _stock_fetcher = StockDataFetcher()
 _config_path = Path(__file__).parent.parent / "config" / "config.json"
-_omx_path = Path(__file__).parent.parent / "config" / "omx_stockholm.json"
+_research_agent = ResearchAgent(str(_config_path))
 
+# Server-Sent Events: how often to look for new quote changes, and how long
+# a connection may stay silent before a heartbeat comment is sent
+STREAM_CHECK_SECONDS = 1
+STREAM_HEARTBEAT_SECONDS = 15
 
-def _load_config():
-    with open(_config_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# Max symbols per batch history request
+MAX_HISTORY_SYMBOLS = 200
 
 
-def _load_omx_stocks():
-    """Load full OMX Stockholm stock list."""
-    with open(_omx_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _snapshot(symbol: str):
+    """Snapshot for a symbol built on the poller's quote (never calls Yahoo)."""
+    name = universe.lookup(symbol).get("name", symbol)
+    return _research_agent.snapshots.from_quote(symbol, name, quote_store.get(symbol))
 
 
-@ttl_cache(seconds=300)
-def _get_stock_info(symbol: str) -> dict:
-    return _stock_fetcher.get_stock_info(symbol)
-
-
-@ttl_cache(seconds=300)
 def _check_unusual_activity(symbol: str) -> dict:
-    return _stock_fetcher.check_unusual_activity(symbol)
-
-
-def _fetch_stock_data(stock: dict, cap_size: str = "") -> dict:
-    """Fetch stock data for a single stock."""
-    symbol = stock["symbol"]
-    data = _get_stock_info(symbol)
-    return {
-        "symbol": symbol,
-        "name": stock["name"],
-        "market": stock.get("market", "OMX Stockholm"),
-        "cap_size": cap_size,
-        "current_price": data.get("current_price", 0),
-        "change_percent": data.get("change_percent", 0),
-        "volume_vs_avg": data.get("volume_vs_avg", 1),
-        "currency": data.get("currency", "SEK"),
-        "high_52w": data.get("high_52w"),
-        "low_52w": data.get("low_52w"),
-        "error": data.get("error"),
-    }
+    return _snapshot(symbol).activity
 
 
 @router.get("/all")
@@ -70,67 +62,21 @@ def get_all_stocks(
     sort_by: Optional[str] = Query("change_percent", description="Sort field"),
     sort_desc: bool = Query(True, description="Sort descending"),
 ):
-    """Get all stocks with filtering, searching, and pagination."""
-    omx_data = _load_omx_stocks()
-    stocks_config = omx_data.get("stocks", {})
-
-    # Build stock list with cap size info
-    all_stocks = []
-
-    if cap is None or cap == "large":
-        for stock in stocks_config.get("large_cap", []):
-            all_stocks.append({**stock, "cap_size": "large", "market": "OMX Stockholm"})
-
-    if cap is None or cap == "mid":
-        for stock in stocks_config.get("mid_cap", []):
-            all_stocks.append({**stock, "cap_size": "mid", "market": "OMX Stockholm"})
-
-    if cap is None or cap == "small":
-        for stock in stocks_config.get("small_cap", []):
-            all_stocks.append({**stock, "cap_size": "small", "market": "OMX Stockholm"})
-
-    if cap is None or cap == "first_north":
-        for stock in stocks_config.get("first_north", []):
-            all_stocks.append({**stock, "cap_size": "first_north", "market": "First North"})
-
-    if cap is None or cap == "us":
-        for stock in stocks_config.get("us_watchlist", []):
-            all_stocks.append({**stock, "cap_size": "us"})
-
-    # Apply search filter
-    if search:
-        search_lower = search.lower()
-        all_stocks = [
-            s for s in all_stocks
-            if search_lower in s["symbol"].lower() or search_lower in s["name"].lower()
-        ]
-
-    total_count = len(all_stocks)
-
-    # Paginate before fetching (to limit API calls)
-    paginated_stocks = all_stocks[offset:offset + limit]
-
-    # Fetch data in parallel
-    results = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {
-            executor.submit(_fetch_stock_data, stock, stock.get("cap_size", "")): stock
-            for stock in paginated_stocks
-        }
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                if result.get("current_price", 0) > 0:  # Only include valid stocks
-                    results.append(result)
-            except Exception as e:
-                continue
-
-    # Sort results
-    if sort_by:
-        results.sort(
-            key=lambda x: x.get(sort_by, 0) or 0,
-            reverse=sort_desc
-        )
+    """
+    Get all stocks with filtering, searching, and pagination.
+
+    Pages are slices of a globally sorted ranking of the whole universe,
+    so sorting applies across pages. Only stocks with a valid price are
+    ranked, and `total` counts those.
+    """
+    results, total_count = ranking.page(
+        cap=cap,
+        search=search,
+        sort_by=sort_by,
+        sort_desc=sort_desc,
+        offset=offset,
+        limit=limit,
+    )
 
     return {
         "stocks": results,
@@ -141,54 +87,36 @@ def get_all_stocks(
 
 
 @router.get("/top-movers")
-def get_top_movers(limit: int = Query(10, ge=1, le=50)):
-    """Get top gaining and losing stocks."""
-    omx_data = _load_omx_stocks()
-    stocks_config = omx_data.get("stocks", {})
-
-    # Focus on large and mid cap for top movers
-    all_stocks = []
-    for stock in stocks_config.get("large_cap", []):
-        all_stocks.append({**stock, "cap_size": "large", "market": "OMX Stockholm"})
-    for stock in stocks_config.get("mid_cap", []):
-        all_stocks.append({**stock, "cap_size": "mid", "market": "OMX Stockholm"})
-
-    # Fetch data in parallel
-    results = []
-    with ThreadPoolExecutor(max_workers=15) as executor:
-        futures = {
-            executor.submit(_fetch_stock_data, stock, stock.get("cap_size", "")): stock
-            for stock in all_stocks
-        }
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                if result.get("current_price", 0) > 0:
-                    results.append(result)
-            except:
-                continue
-
-    # Sort by change percent
-    results.sort(key=lambda x: x.get("change_percent", 0), reverse=True)
-
-    gainers = results[:limit]
-    losers = results[-limit:][::-1]
-
-    return {
-        "gainers": gainers,
-        "losers": losers,
-    }
+def get_top_movers(
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    segments: str = Query("large,mid", description="Comma-separated: large, mid, small, first_north, us, or all"),
+):
+    """Get top gaining and losing stocks (large and mid cap by default)."""
+    wanted = None if segments == "all" else [s.strip() for s in segments.split(",") if s.strip()]
+    unknown = [s for s in wanted or [] if s not in SEGMENTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown segments: {', '.join(unknown)}")
+
+    # Maintained incrementally by the quote poller; this is an O(limit) read,
+    # and unchanged rankings reuse the serialised body (304 on a matching ETag)
+    return responses.respond(
+        request,
+        ("top-movers", tuple(wanted or ()), limit),
+        (top_movers.version, universe.version),
+        lambda: top_movers.top(wanted, limit),
+    )
 
 
 @router.get("/watchlist")
 def get_watchlist():
     """Get original watchlist stocks with current data (legacy endpoint)."""
-    config = _load_config()
-    watchlist = config.get("watchlist", [])
+    watchlist = universe.watchlist()
+    quotes = quote_store.get_many(s["symbol"] for s in watchlist)
     results = []
 
     for stock in watchlist:
-        data = _get_stock_info(stock["symbol"])
+        data = quotes.get(stock["symbol"], {})
         results.append({
             "symbol": stock["symbol"],
             "name": stock["name"],
@@ -206,24 +134,117 @@ def get_watchlist():
 @router.get("/caps")
 def get_cap_sizes():
     """Get available cap sizes and stock counts."""
-    omx_data = _load_omx_stocks()
-    stocks_config = omx_data.get("stocks", {})
-
+    segments = universe.segments()
     return {
         "caps": [
-            {"id": "large", "name": "Large Cap", "count": len(stocks_config.get("large_cap", []))},
-            {"id": "mid", "name": "Mid Cap", "count": len(stocks_config.get("mid_cap", []))},
-            {"id": "small", "name": "Small Cap", "count": len(stocks_config.get("small_cap", []))},
-            {"id": "first_north", "name": "First North", "count": len(stocks_config.get("first_north", []))},
-            {"id": "us", "name": "US Market", "count": len(stocks_config.get("us_watchlist", []))},
+            {"id": cap, "name": name, "count": len(segments.get(cap, []))}
+            for cap, (_, _, name) in SEGMENTS.items()
         ]
     }
 
 
+def _sse(event: str, data: dict, event_id: str) -> str:
+    """Format one Server-Sent Event."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _subscribed_changes(changes: dict, wanted: Optional[set]) -> dict:
+    if wanted is None:
+        return changes
+    return {s: fields for s, fields in changes.items() if s in wanted}
+
+
+@router.get("/stream")
+async def stream_quotes(
+    request: Request,
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols (default: whole universe)"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Push quote changes as Server-Sent Events.
+
+    The first event is a "snapshot" of all subscribed quotes. After that,
+    each poller refresh produces a "quotes" event with only the changed
+    fields per symbol. Reconnecting with Last-Event-ID replays missed
+    changes, or sends a new snapshot if they are no longer in the changelog.
+    """
+    wanted = [s.strip() for s in symbols.split(",") if s.strip()] if symbols else None
+    wanted_set = set(wanted) if wanted is not None else None
+
+    def snapshot():
+        event_id = quote_store.last_event_id
+        quotes = quote_store.get_many(wanted if wanted is not None else quote_store.tracked)
+        return event_id, _sse("snapshot", quotes, event_id)
+
+    async def events():
+        yield "retry: 5000\n\n"
+        event_id = last_event_id
+        last_sent = time.monotonic()
+
+        while True:
+            replay = quote_store.changes_since(event_id)
+            if replay is None:
+                event_id, message = snapshot()
+                yield message
+                last_sent = time.monotonic()
+            else:
+                for next_id, changes in replay:
+                    event_id = next_id
+                    changed = _subscribed_changes(changes, wanted_set)
+                    if changed:
+                        yield _sse("quotes", changed, event_id)
+                        last_sent = time.monotonic()
+
+            if time.monotonic() - last_sent >= STREAM_HEARTBEAT_SECONDS:
+                yield ": heartbeat\n\n"
+                last_sent = time.monotonic()
+
+            if await request.is_disconnected():
+                break
+            await asyncio.sleep(STREAM_CHECK_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _history_response(payload: dict, columns_by_symbol: dict, accept: Optional[str]):
+    """Encode a history payload as JSON, or Arrow/msgpack if the client asked for it."""
+    encoding = negotiate(accept)
+    if encoding == "arrow":
+        return Response(encode_arrow(columns_by_symbol), media_type=ARROW_MEDIA_TYPE)
+    if encoding == "msgpack":
+        return Response(encode_msgpack(payload), media_type="application/msgpack")
+    return payload
+
+
+@router.get("/history")
+def get_stocks_history(
+    symbols: str = Query(..., description="Comma-separated symbols"),
+    days: int = 30,
+    accept: Optional[str] = Header(None),
+):
+    """Columnar OHLCV history for many symbols in one response."""
+    symbol_list = list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbol_list) > MAX_HISTORY_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HISTORY_SYMBOLS} symbols per request")
+
+    histories = _stock_fetcher.get_price_histories(symbol_list, days)
+    data = {s: history_columns(df) for s, df in histories.items() if not df.empty}
+    missing = [s for s in symbol_list if s not in data]
+    return _history_response({"days": days, "data": data, "missing": missing}, data, accept)
+
+
 @router.get("/{symbol}")
 def get_stock(symbol: str):
     """Get detailed stock data."""
-    data = _get_stock_info(symbol)
+    data = quote_store.get(symbol)
+    if data.get("pending"):
+        raise HTTPException(status_code=503, detail=data["error"], headers={"Retry-After": "5"})
     if "error" in data and not data.get("current_price"):
         raise HTTPException(status_code=404, detail=data["error"])
     return data
@@ -236,47 +257,24 @@ def get_stock_activity(symbol: str):
 
 
 @router.get("/{symbol}/history")
-def get_stock_history(symbol: str, days: int = 30):
-    """Get price history as OHLCV data."""
+def get_stock_history(
+    symbol: str,
+    days: int = 30,
+    format: str = Query("records", pattern="^(records|columns)$", description="records or columns"),
+    accept: Optional[str] = Header(None),
+):
+    """Get price history as OHLCV data (JSON records/columns, Arrow or msgpack)."""
     df = _stock_fetcher.get_price_history(symbol, days)
     if df.empty:
         raise HTTPException(status_code=404, detail=f"No history for {symbol}")
 
-    records = []
-    for idx, row in df.iterrows():
-        records.append({
-            "time": idx.strftime("%Y-%m-%d"),
-            "open": round(row["Open"], 2),
-            "high": round(row["High"], 2),
-            "low": round(row["Low"], 2),
-            "close": round(row["Close"], 2),
-            "volume": int(row["Volume"]),
-        })
-    return {"symbol": symbol, "data": records}
+    columns = history_columns(df)
+    data = columns if format == "columns" else history_records(columns)
+    return _history_response({"symbol": symbol, "data": data}, {symbol: columns}, accept)
 
 
 @router.get("/{symbol}/analysis")
 def get_stock_analysis(symbol: str):
     """Full analysis combining stock data, news, and congress activity."""
-    # Try to find stock in OMX list first
-    omx_data = _load_omx_stocks()
-    stocks_config = omx_data.get("stocks", {})
-
-    stock_info = None
-    for cap in ["large_cap", "mid_cap", "small_cap", "us_watchlist"]:
-        for stock in stocks_config.get(cap, []):
-            if stock["symbol"] == symbol:
-                stock_info = stock
-                break
-        if stock_info:
-            break
-
-    if not stock_info:
-        # Fallback to config
-        config = _load_config()
-        watchlist = {s["symbol"]: s for s in config.get("watchlist", [])}
-        stock_info = watchlist.get(symbol, {"symbol": symbol, "name": symbol})
-
-    agent = ResearchAgent(str(_config_path))
-    analysis = agent.analyze_stock(stock_info["symbol"], stock_info.get("name", symbol))
-    return analysis
+    snapshot = _snapshot(symbol)
+    return _research_agent.analyze_stock(snapshot.symbol, snapshot.name, snapshot=snapshot)
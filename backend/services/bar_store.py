@@ -0,0 +1,216 @@
+"""
+Persistent on-disk OHLCV bar store.
+
+One NumPy file per symbol under data/bars/, read back memory-mapped.
+StockDataFetcher reads every price window through this store and only
+downloads the bars that are missing since the last stored timestamp.
+
+Bars are split/dividend adjusted by Yahoo, so each sync re-fetches one
+already complete stored bar as well: if its close no longer matches, the
+adjustment basis has changed and the symbol's file is rebuilt.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+
+BARS_DIR = Path(__file__).parent.parent / "data" / "bars"
+
+BAR_DTYPE = np.dtype([
+    ("time", "<i8"),  # tz-naive exchange-local timestamp, ns
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# Relative close difference on a re-fetched bar that means the history was re-adjusted
+ADJUSTMENT_TOLERANCE = 1e-3
+
+
+class BarStore:
+    """Daily bars per symbol, stored as structured NumPy arrays."""
+
+    def __init__(self, root: Path = BARS_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._synced_at: dict = {}
+        self._synced_wall: dict = {}
+        self._covered_from: dict = {}
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / f"{quote(symbol, safe='')}.npy"
+
+    def read(self, symbol: str) -> np.ndarray:
+        """All stored bars for a symbol, oldest first (memory-mapped)."""
+        path = self._path(symbol)
+        if not path.exists():
+            return np.empty(0, dtype=BAR_DTYPE)
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"Trasig barfil för {symbol}, ignorerar: {e}")
+            return np.empty(0, dtype=BAR_DTYPE)
+
+    def mark_synced(self, symbols):
+        """Record that `symbols` were just brought up to date upstream."""
+        now, wall = time.monotonic(), time.time()
+        for symbol in symbols:
+            self._synced_at[symbol] = now
+            self._synced_wall[symbol] = wall
+
+    def is_fresh(self, symbol: str, max_age: float) -> bool:
+        """True if the symbol was synced within the last `max_age` seconds."""
+        synced = self._synced_at.get(symbol)
+        return synced is not None and time.monotonic() - synced < max_age
+
+    def synced_after(self, symbol: str, when) -> bool:
+        """True if the symbol was synced after the (aware) datetime `when`."""
+        synced = self._synced_wall.get(symbol)
+        return synced is not None and synced > when.timestamp()
+
+    def covers(self, symbol: str, start) -> bool:
+        """
+        True if stored bars reach back to `start`, or history from `start`
+        was already requested (the symbol may simply be younger than that).
+        """
+        start = pd.Timestamp(start)
+        requested = self._covered_from.get(symbol)
+        if requested is not None and requested <= start:
+            return True
+        first = self.first_time(symbol)
+        # Allow for weekends and holidays before the first stored bar
+        return first is not None and first <= start + pd.Timedelta(days=7)
+
+    def mark_covered(self, symbol: str, start):
+        self._covered_from[symbol] = pd.Timestamp(start)
+
+    def first_time(self, symbol: str) -> Optional[pd.Timestamp]:
+        bars = self.read(symbol)
+        return pd.Timestamp(int(bars["time"][0])) if len(bars) else None
+
+    def last_time(self, symbol: str) -> Optional[pd.Timestamp]:
+        bars = self.read(symbol)
+        return pd.Timestamp(int(bars["time"][-1])) if len(bars) else None
+
+    def resync_from(self, symbol: str) -> Optional[pd.Timestamp]:
+        """
+        Where the next sync should start: the last complete stored bar (the
+        one before the possibly partial last bar), so it can be compared.
+        """
+        bars = self.read(symbol)
+        if not len(bars):
+            return None
+        return pd.Timestamp(int(bars["time"][-2 if len(bars) > 1 else -1]))
+
+    @staticmethod
+    def _to_bars(frame: pd.DataFrame) -> np.ndarray:
+        frame = frame.dropna(subset=["Close"])
+        index = frame.index
+        if getattr(index, "tz", None) is not None:
+            index = index.tz_localize(None)
+
+        bars = np.empty(len(frame), dtype=BAR_DTYPE)
+        bars["time"] = index.as_unit("ns").asi8
+        for field, column in COLUMNS.items():
+            bars[field] = frame[column].to_numpy(dtype="f8", na_value=np.nan)
+        return bars
+
+    def adjustment_changed(self, symbol: str, frame: pd.DataFrame) -> bool:
+        """
+        True if downloaded bars disagree with stored complete bars (every
+        stored bar but the last) at the same timestamps, i.e. Yahoo has
+        re-adjusted the history for a split or dividend since it was stored.
+        """
+        stored = self.read(symbol)[:-1]
+        new = self._to_bars(frame)
+        if not len(stored) or not len(new):
+            return False
+        common, i, j = np.intersect1d(stored["time"], new["time"], return_indices=True)
+        if not len(common):
+            return False
+        old_close = np.asarray(stored["close"][i])
+        new_close = new["close"][j]
+        diff = np.abs(new_close - old_close) / np.maximum(np.abs(old_close), 1e-9)
+        return bool(np.nanmax(diff, initial=0.0) > ADJUSTMENT_TOLERANCE)
+
+    def replace(self, symbol: str, frame: pd.DataFrame):
+        """Replace a symbol's stored series with `frame` (after a re-adjustment)."""
+        new = self._to_bars(frame)
+        if not len(new):
+            return
+        with self._lock:
+            self._write(symbol, new[np.argsort(new["time"], kind="stable")])
+
+    def merge(self, symbol: str, frame: pd.DataFrame):
+        """
+        Merge downloaded bars into the stored series.
+
+        Rows in `frame` replace stored rows with the same timestamp, which
+        keeps today's partial bar up to date between polls.
+        """
+        new = self._to_bars(frame)
+        if not len(new):
+            return
+
+        with self._lock:
+            stored = np.array(self.read(symbol))
+            if len(stored):
+                stored = stored[~np.isin(stored["time"], new["time"])]
+                new = np.concatenate([stored, new])
+            new = new[np.argsort(new["time"], kind="stable")]
+            self._write(symbol, new)
+
+    def discard(self, symbol: str):
+        """Drop a symbol's stored bars and sync marks; the next read downloads its history again."""
+        with self._lock:
+            self._synced_at.pop(symbol, None)
+            self._synced_wall.pop(symbol, None)
+            self._covered_from.pop(symbol, None)
+            try:
+                self._path(symbol).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write(self, symbol: str, bars: np.ndarray):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(symbol)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp, path)
+
+    def window(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """Bars with start <= time <= end as an OHLCV DataFrame."""
+        bars = self.read(symbol)
+        if len(bars):
+            times = bars["time"]
+            lo = np.searchsorted(times, pd.Timestamp(start).value) if start is not None else 0
+            hi = np.searchsorted(times, pd.Timestamp(end).value, side="right") if end is not None else len(bars)
+            bars = bars[lo:hi]
+        return self._to_frame(bars)
+
+    def tail(self, symbol: str, n: int) -> pd.DataFrame:
+        """The last `n` stored bars."""
+        return self._to_frame(self.read(symbol)[-n:])
+
+    @staticmethod
+    def _to_frame(bars: np.ndarray) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.asarray(bars["time"]).astype("datetime64[ns]"), name="Date")
+        return pd.DataFrame(
+            {column: np.asarray(bars[field]) for field, column in COLUMNS.items()},
+            index=index,
+        )
+
+
+bar_store = BarStore()
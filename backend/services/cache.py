@@ -1,41 +1,542 @@
 """
 In-memory TTL cache for API responses.
+
+Each cached function gets its own namespace: a thread-safe LRU bounded by
+entry count (and optionally approximate size in bytes), with expiry on
+the monotonic clock, tuple keys built from the call arguments, and hit /
+miss / eviction counters.
+
+With stale_while_revalidate, an expired entry is still served for that
+many seconds while one background call refreshes it.
+
+With persist=True, a namespace writes through to the shared L2 cache
+(services/shared_cache.py: SQLite or Redis) and falls back to it on a
+miss, so warm entries survive restarts and are shared between workers.
+
+Cache misses are single-flight: concurrent callers with the same key
+(threads or coroutines) wait for the one call already in flight instead
+of each calling upstream. Those callers are counted as `coalesced`, not
+as misses, so `misses` is the number of calls that reached the function.
 """
 
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from fnmatch import fnmatchcase
 from functools import wraps
-from datetime import datetime, timedelta
-import hashlib
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+import asyncio
 import json
+import sys
+import threading
+import time
+
+from services.cache_backend import key_text
+from services.shared_cache import shared_cache
+from services.market_calendar import valid_until
+
+
+# Default bound per namespace when a decorator does not set one
+DEFAULT_MAX_ENTRIES = 256
+
+# lookup() states
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+# Upper bounds (seconds) of the entry-age histogram in describe()
+AGE_BUCKETS = ((60, "<1m"), (300, "1-5m"), (900, "5-15m"), (3600, "15-60m"), (21600, "1-6h"))
+
+
+def _sizeof(value, _depth: int = 0) -> int:
+    """Approximate deep size in bytes of plain data (dicts, lists, scalars, frames)."""
+    size = sys.getsizeof(value)
+    if _depth > 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(_sizeof(k, _depth + 1) + _sizeof(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(v, _depth + 1) for v in value)
+    elif hasattr(value, "memory_usage"):  # pandas objects
+        try:
+            size = int(value.memory_usage(deep=True).sum())
+        except Exception:
+            pass
+    return size
+
+
+class CacheNamespace:
+    """One bounded LRU+TTL cache (one per cached function)."""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+        max_bytes: Optional[int] = None,
+        persist: bool = False,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, stale_until, size in bytes, stored_at); times on time.monotonic()
+        self._entries: "OrderedDict[Hashable, Tuple[object, float, float, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.l2_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key: Hashable, count: bool = True) -> Tuple[str, object]:
+        """(FRESH, value), (STALE, value) inside the stale window, or (MISS, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                now = time.monotonic()
+                if now < entry[2]:
+                    self._entries.move_to_end(key)
+                    if now < entry[1]:
+                        self.hits += count
+                        return FRESH, entry[0]
+                    self.stale_hits += count
+                    return STALE, entry[0]
+                self._remove(key)
+                self.expirations += 1
+            if not self.persist:
+                self.misses += count
+                return MISS, None
+        return self._load_shared(key, count)
+
+    def _load_shared(self, key: Hashable, count: bool) -> Tuple[str, object]:
+        """L2 fallback: promote a shared entry into memory."""
+        stored = shared_cache.get(self.name, key)
+        with self._lock:
+            if stored is None:
+                self.misses += count
+                return MISS, None
+            value, expires_at, stale_until = stored
+            now, wall = time.monotonic(), time.time()
+            expires = now + (expires_at - wall if expires_at is not None else float("inf"))
+            stale = now + (stale_until - wall if stale_until is not None else float("inf"))
+            self._insert(key, value, expires, stale)
+            self.l2_hits += count
+            if now < expires:
+                self.hits += count
+                return FRESH, value
+            self.stale_hits += count
+            return STALE, value
+
+    def count_coalesced(self):
+        """Recount a miss as coalesced: the caller got the result of another caller's call."""
+        with self._lock:
+            self.misses -= 1
+            self.coalesced += 1
+
+    def get(self, key: Hashable, count: bool = True) -> Tuple[bool, object]:
+        """(True, value) for a fresh entry, else (False, None)."""
+        state, value = self.lookup(key, count)
+        return (True, value) if state == FRESH else (False, None)
+
+    def set(self, key: Hashable, value, ttl: float, stale_ttl: float = 0):
+        with self._lock:
+            expires = time.monotonic() + ttl
+            self._insert(key, value, expires, expires + stale_ttl)
+        if self.persist:
+            shared_cache.put(self.name, key, value, ttl, stale_ttl)
+
+    def _insert(self, key: Hashable, value, expires: float, stale_until: float):
+        """Add an entry and evict LRU entries over the bounds (caller holds the lock)."""
+        size = _sizeof(value) if self.max_bytes else 0
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires, stale_until, size, time.monotonic())
+        self._bytes += size
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1)
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        size = self._entries.pop(key)[3]
+        self._bytes -= size
+
+    def invalidate(self, key: Hashable = None) -> int:
+        """Drop one key, or every entry if key is None. Returns entries removed."""
+        if self.persist:
+            shared_cache.delete(self.name, key)
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return removed
+            if key in self._entries:
+                self._remove(key)
+                return 1
+            return 0
+
+    def invalidate_matching(self, pattern: str) -> int:
+        """Drop every key whose text form matches a glob pattern (e.g. "*VOLV-B.ST*")."""
+        if self.persist:
+            shared_cache.delete_matching(self.name, pattern)
+        with self._lock:
+            matched = [k for k in self._entries if fnmatchcase(key_text(k), pattern)]
+            for key in matched:
+                self._remove(key)
+            return len(matched)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, entry in self._entries.items() if now >= entry[2]]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+            return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes if self.max_bytes else None,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "l2_hits": self.l2_hits if self.persist else None,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def describe(self, keys: int = 0) -> dict:
+        """
+        stats() plus a memory estimate, fresh/stale counts and an entry-age
+        histogram; with keys > 0, also the `keys` most recently used keys.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        ages = {label: 0 for _, label in AGE_BUCKETS}
+        ages[">6h"] = 0
+        bounds = [bound for bound, _ in AGE_BUCKETS]
+        labels = [label for _, label in AGE_BUCKETS] + [">6h"]
+        stale = 0
+        for _, (_, expires, _, _, stored_at) in entries:
+            ages[labels[bisect_right(bounds, now - stored_at)]] += 1
+            stale += now >= expires
+        info = self.stats()
+        info.update({
+            "memory_bytes": self._bytes if self.max_bytes else sum(_sizeof(e[0]) for _, e in entries),
+            "fresh": len(entries) - stale,
+            "stale": stale,
+            "age": ages,
+        })
+        if keys:
+            info["keys"] = [
+                {
+                    "key": key_text(key),
+                    "age_seconds": round(now - stored_at, 1),
+                    "expires_in": round(expires - now, 1),
+                }
+                for key, (_, expires, _, _, stored_at) in reversed(entries[-keys:])
+            ]
+        return info
+
+
+_namespaces: Dict[str, CacheNamespace] = {}
+_namespaces_lock = threading.Lock()
+
+
+def namespace(
+    name: str,
+    max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+    max_bytes: Optional[int] = None,
+    persist: bool = False,
+) -> CacheNamespace:
+    """Get or create a named cache namespace."""
+    with _namespaces_lock:
+        if name not in _namespaces:
+            _namespaces[name] = CacheNamespace(name, max_entries, max_bytes, persist)
+        return _namespaces[name]
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key onto one in-flight Future.
+
+    Works for threads (Future.result) and coroutines (asyncio.wrap_future),
+    and for batches: claim() hands each key to exactly one caller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], List[Future]]:
+        """
+        Claim keys nobody is working on.
+
+        Returns:
+            (keys this caller must resolve, futures of keys already in flight)
+        """
+        mine, waiting = [], []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._inflight.get(key)
+                if future is None:
+                    self._inflight[key] = Future()
+                    mine.append(key)
+                else:
+                    waiting.append(future)
+        return mine, waiting
 
+    def future(self, key: Hashable) -> Optional[Future]:
+        """The in-flight Future for a key, if any."""
+        with self._lock:
+            return self._inflight.get(key)
 
-_cache: dict = {}
+    def resolve(self, keys: Iterable[Hashable], result=None, error: BaseException = None, future: Future = None):
+        """
+        Complete claimed keys and wake everyone waiting on them. With `future`,
+        only keys whose in-flight call is still that Future are completed (a
+        late cleanup must not complete a newer claim of the same key).
+        """
+        with self._lock:
+            futures = [
+                self._inflight.pop(key) for key in keys
+                if key in self._inflight and (future is None or self._inflight[key] is future)
+            ]
+        for future in futures:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def do(self, key: Hashable, func, *args, on_wait: Callable[[], None] = None, **kwargs):
+        """
+        Run func once per key at a time; concurrent callers share its result.
+        `on_wait` is called when this caller joins a call already in flight.
+        """
+        mine, waiting = self.claim([key])
+        if waiting:
+            if on_wait is not None:
+                on_wait()
+            return waiting[0].result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.resolve(mine, error=e)
+            raise
+        self.resolve(mine, result)
+        return result
+
+    async def do_async(self, key: Hashable, func, *args, on_wait: Callable[[], None] = None, **kwargs):
+        """Async variant of do() for coroutine functions."""
+        mine, waiting = self.claim([key])
+        if waiting:
+            if on_wait is not None:
+                on_wait()
+            return await asyncio.wrap_future(waiting[0])
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            self.resolve(mine, error=e)
+            raise
+        self.resolve(mine, result)
+        return result
+
+
+_flight = SingleFlight()
+
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    """Tuple key from call arguments; unhashable arguments fall back to JSON."""
+    key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return json.dumps((args, kwargs), sort_keys=True, default=str)
+
+
+def _ttl(seconds: float, markets) -> float:
+    """Seconds an entry stays valid; with markets, at least until the next open."""
+    if markets:
+        # Prices cannot change while the markets are closed
+        until = valid_until(markets)
+        if until is not None:
+            return max(seconds, (until - datetime.now(until.tzinfo)).total_seconds())
+    return seconds
 
 
-def ttl_cache(seconds: int):
-    """Decorator that caches function results with a time-to-live."""
+# Keeps background revalidation tasks referenced until they finish
+_tasks: set = set()
+
+
+def _background(task: "asyncio.Task"):
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def ttl_cache(
+    seconds: int,
+    markets: tuple = None,
+    max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+    max_bytes: Optional[int] = None,
+    stale_while_revalidate: float = 0,
+    persist: bool = False,
+):
+    """
+    Decorator that caches function results with a time-to-live.
+
+    With `markets` (e.g. ("XSTO", "XNYS")), results computed while all of
+    those markets are closed stay valid until the next open.
+
+    With `stale_while_revalidate` (seconds), an expired result is returned
+    immediately for that long after expiry while a single background call
+    refreshes it; only misses beyond the window block on the function.
+
+    With `persist`, results are also stored in the shared L2 cache and
+    reloaded from it after a restart or by other workers. Return values
+    must be picklable.
+
+    Works on plain and async functions; concurrent misses for the same
+    arguments share one call. Entries live in a namespace named after the
+    function, bounded by `max_entries` / `max_bytes` with LRU eviction.
+    """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            key = f"{func.__name__}:{hashlib.md5(json.dumps((args, kwargs), default=str).encode()).hexdigest()}"
-            if key in _cache:
-                result, expiry = _cache[key]
-                if datetime.now() < expiry:
+        ns = namespace(f"{func.__module__}.{func.__qualname__}", max_entries, max_bytes, persist)
+
+        def store(key, result):
+            ns.set(key, result, _ttl(seconds, markets), stale_while_revalidate)
+
+        if asyncio.iscoroutinefunction(func):
+            async def load_async(key, args, kwargs):
+                hit, result = ns.get(key, count=False)
+                if hit:
+                    ns.count_coalesced()
                     return result
+                result = await func(*args, **kwargs)
+                store(key, result)
+                return result
+
+            async def refresh_async(claimed, key, args, kwargs):
+                # Resolve in finally: a cancelled task must not leave its key in flight
+                result, error = None, None
+                try:
+                    result = await func(*args, **kwargs)
+                    store(key, result)
+                except Exception as e:
+                    error = e
+                    print(f"Bakgrundsuppdatering av {ns.name} misslyckades: {e}")
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    _flight.resolve(claimed, result, error)
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                state, result = ns.lookup(key)
+                if state == FRESH:
+                    return result
+                if state == STALE:
+                    claimed, _ = _flight.claim([(ns.name, key)])
+                    if claimed:
+                        future = _flight.future(claimed[0])
+                        task = asyncio.get_running_loop().create_task(
+                            refresh_async(claimed, key, args, kwargs)
+                        )
+                        # A task cancelled before it started never reaches its finally;
+                        # resolve only this claim, the key may be claimed again by then
+                        task.add_done_callback(
+                            lambda _: _flight.resolve(claimed, error=asyncio.CancelledError(), future=future)
+                        )
+                        _background(task)
+                    return result
+                return await _flight.do_async(
+                    (ns.name, key), load_async, key, args, kwargs, on_wait=ns.count_coalesced
+                )
+            async_wrapper.cache = ns
+            return async_wrapper
+
+        def load(key, args, kwargs):
+            # Another caller may have filled the cache while we waited for the claim
+            hit, result = ns.get(key, count=False)
+            if hit:
+                ns.count_coalesced()
+                return result
             result = func(*args, **kwargs)
-            _cache[key] = (result, datetime.now() + timedelta(seconds=seconds))
+            store(key, result)
             return result
+
+        def refresh(claimed, key, args, kwargs):
+            result, error = None, None
+            try:
+                result = func(*args, **kwargs)
+                store(key, result)
+            except Exception as e:
+                error = e
+                print(f"Bakgrundsuppdatering av {ns.name} misslyckades: {e}")
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _flight.resolve(claimed, result, error)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            state, result = ns.lookup(key)
+            if state == FRESH:
+                return result
+            if state == STALE:
+                claimed, _ = _flight.claim([(ns.name, key)])
+                if claimed:
+                    threading.Thread(
+                        target=refresh, args=(claimed, key, args, kwargs),
+                        name=f"revalidate-{func.__name__}", daemon=True,
+                    ).start()
+                return result
+            return _flight.do((ns.name, key), load, key, args, kwargs, on_wait=ns.count_coalesced)
+        wrapper.cache = ns
         return wrapper
     return decorator
 
 
+def get_namespace(name: str) -> Optional[CacheNamespace]:
+    """An existing namespace, or None."""
+    with _namespaces_lock:
+        return _namespaces.get(name)
+
+
+def namespaces() -> List[CacheNamespace]:
+    """Every namespace created so far."""
+    with _namespaces_lock:
+        return list(_namespaces.values())
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Counters and sizes for every namespace."""
+    return {ns.name: ns.stats() for ns in namespaces()}
+
+
 def clear_cache():
     """Clear all cached entries."""
-    _cache.clear()
+    for ns in namespaces():
+        ns.invalidate()
 
 
-def clear_expired():
-    """Remove expired entries from cache."""
-    now = datetime.now()
-    expired = [k for k, (_, exp) in _cache.items() if now >= exp]
-    for k in expired:
-        del _cache[k]
+def clear_expired() -> int:
+    """Remove expired entries from every namespace and the L2 cache."""
+    return sum(ns.purge_expired() for ns in namespaces()) + shared_cache.purge_expired()
@@ -0,0 +1,127 @@
+"""
+Interface for the shared second-tier (L2) cache.
+
+The in-memory namespaces in services/cache.py, the quote store, stored
+briefings and the congress download all sit on one CacheBackend, chosen
+in services/shared_cache.py:
+- DiskCache (services/disk_cache.py): one SQLite file, shared by every
+  worker process on the same host
+- RedisCache (services/redis_cache.py): a Redis server, shared by every
+  worker on every host
+
+Values are pickled with a wall-clock expiry and an optional stale window.
+Backends never raise on I/O errors; a failed read is a miss.
+
+Backends also hand out short leases (claim/release), so that of several
+workers about to fetch the same keys upstream only one does.
+"""
+
+import hashlib
+import hmac
+import os
+import pickle
+import socket
+import time
+import uuid
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+# Bumped when the stored format changes; older entries are ignored
+FORMAT = 1
+
+# (value, expires_at, stale_until) as epoch seconds, None = never
+Entry = Tuple[object, Optional[float], Optional[float]]
+
+# Identifies this process as the holder of a lease
+LEASE_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_MAC_BYTES = hashlib.sha256().digest_size
+
+
+def key_text(key: Hashable) -> str:
+    """Stable text form of a cache key (tuples of plain values or a JSON string)."""
+    return key if isinstance(key, str) else repr(key)
+
+
+def expiry(ttl: Optional[float], stale_ttl: float = 0) -> Tuple[Optional[float], Optional[float]]:
+    """(expires_at, stale_until) for an entry stored now; (None, None) if ttl is None."""
+    if ttl is None:
+        return None, None
+    expires_at = time.time() + ttl
+    return expires_at, expires_at + stale_ttl
+
+
+def usable(stale_until: Optional[float]) -> bool:
+    return stale_until is None or time.time() < stale_until
+
+
+def dumps(value) -> Optional[bytes]:
+    try:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"Cannot serialise cache value: {e}")
+        return None
+
+
+def loads(blob: bytes):
+    return pickle.loads(blob)
+
+
+def sign(secret: bytes, blob: bytes) -> bytes:
+    """Prefix a blob with its HMAC-SHA256."""
+    return hmac.new(secret, blob, hashlib.sha256).digest() + blob
+
+
+def verified(secret: bytes, data: bytes) -> Optional[bytes]:
+    """The blob inside sign() output, or None if the MAC does not match."""
+    mac, blob = data[:_MAC_BYTES], data[_MAC_BYTES:]
+    if not hmac.compare_digest(mac, hmac.new(secret, blob, hashlib.sha256).digest()):
+        return None
+    return blob
+
+
+class CacheBackend:
+    """Shared store of values keyed by (namespace, key)."""
+
+    name = "none"
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Entry]:
+        """A stored entry that is still usable, or None."""
+        return self.get_many(namespace, [key]).get(key)
+
+    def get_many(self, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, Entry]:
+        """Usable entries for `keys`; missing keys are left out."""
+        raise NotImplementedError
+
+    def put(self, namespace: str, key: Hashable, value, ttl: Optional[float] = None, stale_ttl: float = 0):
+        """Store a value for `ttl` (+ `stale_ttl`) seconds, or forever if ttl is None."""
+        self.put_many(namespace, {key: value}, ttl, stale_ttl)
+
+    def put_many(self, namespace: str, items: Dict[Hashable, object], ttl: Optional[float] = None, stale_ttl: float = 0):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: Hashable = None) -> int:
+        """Drop one key, or the whole namespace if key is None."""
+        raise NotImplementedError
+
+    def delete_matching(self, namespace: str, pattern: str) -> int:
+        """Drop keys in a namespace whose text form matches a glob pattern."""
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Remove entries past their stale window (no-op where the store expires them)."""
+        return 0
+
+    def claim(self, namespace: str, keys: Iterable[Hashable], ttl: float) -> List[Hashable]:
+        """
+        Take leases on `keys` for `ttl` seconds. Returns the keys this process
+        now holds; the others are held by another worker. If the store is
+        unavailable every key is returned, so callers never wait on it.
+        """
+        return list(keys)
+
+    def release(self, namespace: str, keys: Iterable[Hashable]):
+        """Give up leases this process holds."""
+
+    def close(self):
+        pass
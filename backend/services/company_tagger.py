@@ -0,0 +1,184 @@
+"""
+Multi-pattern company tagger over the news corpus.
+
+One Aho–Corasick automaton holds the keywords of every company in the
+universe (full name, first word of the name, cleaned ticker; the same
+keywords NewsFetcher.filter_by_company has always matched). Each article
+is scanned once and tagged with every company it mentions, and the result
+is kept as an inverted index (keyword -> articles) and per-article company
+tags per corpus version, so looking up one company's news no longer scans
+the corpus per company and keyword. The tags are served with
+/api/news/feed articles.
+
+Matching is case-insensitive substring matching, like the linear filter.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.universe import universe
+
+
+def company_keywords(company_name: str, symbol: Optional[str] = None) -> List[str]:
+    """Lowercase keywords that identify a company in article text."""
+    keywords = [company_name.lower()]
+
+    # Variants of the name: the first word
+    if " " in company_name:
+        keywords.append(company_name.split()[0].lower())
+
+    if symbol:
+        # Drop the .ST suffix and share class for Swedish stocks
+        clean_symbol = symbol.replace(".ST", "").replace("-B", "").replace("-A", "")
+        keywords.append(clean_symbol.lower())
+
+    return keywords
+
+
+class AhoCorasick:
+    """Automaton over a fixed set of patterns; find() reports every pattern occurring in a text."""
+
+    def __init__(self, patterns):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (pattern,)
+
+    def _link(self):
+        """Breadth-first failure links; outputs include those of the failure chain."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def __contains__(self, pattern: str) -> bool:
+        node = 0
+        for char in pattern:
+            node = self._goto[node].get(char)
+            if node is None:
+                return False
+        return pattern in self._out[node]
+
+    def find(self, text: str) -> Set[str]:
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class CompanyTagger:
+    """Company tags and inverted indexes for one news corpus at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._universe_version = None
+        self._automaton: Optional[AhoCorasick] = None
+        self._symbols_by_keyword: Dict[str, Set[str]] = {}
+        # Index of the last tagged corpus
+        self._corpus_version = None
+        self._articles: List[dict] = []
+        self._by_keyword: Dict[str, List[int]] = {}
+        # id(article) -> symbols it mentions; self._articles keeps those articles
+        # alive, so no other object can have one of these ids meanwhile
+        self._tags: Dict[int, Set[str]] = {}
+
+    def _build_automaton(self):
+        symbols_by_keyword: Dict[str, Set[str]] = {}
+        for stock in [*universe.stocks(), *universe.watchlist()]:
+            for keyword in company_keywords(stock["name"], stock["symbol"]):
+                if keyword:
+                    symbols_by_keyword.setdefault(keyword, set()).add(stock["symbol"])
+        self._symbols_by_keyword = symbols_by_keyword
+        self._automaton = AhoCorasick(symbols_by_keyword)
+        self._universe_version = universe.version
+        self._corpus_version = None
+
+    @staticmethod
+    def _text(article: dict) -> str:
+        return (article["title"] + " " + article.get("summary", "")).lower()
+
+    def _index(self, version, articles: List[dict]):
+        """Tag every article in one pass each (caller holds the lock)."""
+        if self._universe_version != universe.version:
+            self._build_automaton()
+        if version == self._corpus_version and articles is self._articles:
+            return
+        by_keyword: Dict[str, List[int]] = {}
+        tags: Dict[int, Set[str]] = {}
+        for i, article in enumerate(articles):
+            symbols = set()
+            for keyword in self._automaton.find(self._text(article)):
+                by_keyword.setdefault(keyword, []).append(i)
+                symbols |= self._symbols_by_keyword[keyword]
+            tags[id(article)] = symbols
+        self._by_keyword, self._tags = by_keyword, tags
+        self._articles = articles
+        self._corpus_version = version
+
+    def articles_for(
+        self, version, articles: List[dict], company_name: str, symbol: Optional[str] = None
+    ) -> Optional[List[dict]]:
+        """
+        Articles of corpus `version` that mention the company, in corpus order.
+
+        Returns:
+            None if some keyword of the company is not in the automaton (a
+            company outside the universe); use the linear filter then
+        """
+        keywords = company_keywords(company_name, symbol)
+        with self._lock:
+            self._index(version, articles)
+            if not all(k and k in self._automaton for k in keywords):
+                return None
+            hits = sorted({i for k in keywords for i in self._by_keyword.get(k, ())})
+            return [articles[i] for i in hits]
+
+    def tags(self, version, corpus: List[dict], articles: List[dict]) -> List[Set[str]]:
+        """
+        Per article in `articles` (taken from corpus `version`), the symbols of
+        every universe company it mentions. Articles not in the indexed corpus
+        (e.g. from a corpus that has been replaced since) are tagged on the fly.
+        """
+        with self._lock:
+            self._index(version, corpus)
+            result = []
+            for article in articles:
+                symbols = self._tags.get(id(article))
+                if symbols is None:
+                    symbols = set()
+                    for keyword in self._automaton.find(self._text(article)):
+                        symbols |= self._symbols_by_keyword[keyword]
+                result.append(symbols)
+            return result
+
+
+company_tagger = CompanyTagger()
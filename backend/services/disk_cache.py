@@ -0,0 +1,196 @@
+"""
+SQLite implementation of the shared L2 cache.
+
+One file (data/cache.sqlite, override with CACHE_DB_PATH) holds pickled
+values (dicts, lists, pandas frames) per (namespace, key) with a
+wall-clock expiry, so a fresh process can load warm data in milliseconds
+instead of refetching it. WAL mode lets every worker process on the host
+read and write the same file.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from services.cache_backend import (
+    FORMAT, LEASE_OWNER, CacheBackend, Entry, dumps, expiry, key_text, loads, usable,
+)
+
+
+CACHE_DB_PATH = Path(os.environ.get(
+    "CACHE_DB_PATH", Path(__file__).parent.parent / "data" / "cache.sqlite"
+))
+
+# SQLite's default limit on bound parameters per statement is 999
+_BATCH = 500
+
+
+class DiskCache(CacheBackend):
+    """SQLite store of pickled values keyed by (namespace, key)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path = CACHE_DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        format INTEGER NOT NULL,
+                        value BLOB NOT NULL,
+                        expires_at REAL,
+                        stale_until REAL,
+                        PRIMARY KEY (namespace, key)
+                    )
+                """)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS leases (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )
+                """)
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"Disk cache unavailable ({self.path}): {e}")
+        return self._conn
+
+    def _execute(self, sql: str, params=()) -> Optional[sqlite3.Cursor]:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                return conn.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"Disk cache query failed: {e}")
+                return None
+
+    def get_many(self, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, Entry]:
+        by_text = {key_text(k): k for k in keys}
+        texts = list(by_text)
+        rows = []
+        for i in range(0, len(texts), _BATCH):
+            batch = texts[i:i + _BATCH]
+            cur = self._execute(
+                "SELECT key, format, value, expires_at, stale_until FROM entries "
+                f"WHERE namespace = ? AND key IN ({','.join('?' * len(batch))})",
+                (namespace, *batch),
+            )
+            if cur is None:
+                return {}
+            rows.extend(cur.fetchall())
+
+        result = {}
+        for text, fmt, blob, expires_at, stale_until in rows:
+            if fmt != FORMAT or not usable(stale_until):
+                continue
+            try:
+                result[by_text[text]] = (loads(blob), expires_at, stale_until)
+            except Exception as e:
+                print(f"Unreadable disk cache entry {namespace}/{text}: {e}")
+        return result
+
+    def put_many(self, namespace: str, items: Dict[Hashable, object], ttl: Optional[float] = None, stale_ttl: float = 0):
+        expires_at, stale_until = expiry(ttl, stale_ttl)
+        rows = []
+        for key, value in items.items():
+            blob = dumps(value)
+            if blob is not None:
+                rows.append((namespace, key_text(key), FORMAT, blob, expires_at, stale_until))
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"Disk cache write failed for {namespace}: {e}")
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+
+    def delete(self, namespace: str, key: Hashable = None) -> int:
+        if key is None:
+            cur = self._execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        else:
+            cur = self._execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key_text(key)))
+        return cur.rowcount if cur else 0
+
+    def delete_matching(self, namespace: str, pattern: str) -> int:
+        cur = self._execute("DELETE FROM entries WHERE namespace = ? AND key GLOB ?", (namespace, pattern))
+        return cur.rowcount if cur else 0
+
+    def purge_expired(self) -> int:
+        cur = self._execute(
+            "DELETE FROM entries WHERE stale_until IS NOT NULL AND stale_until <= ?", (time.time(),)
+        )
+        return cur.rowcount if cur else 0
+
+    def claim(self, namespace: str, keys: Iterable[Hashable], ttl: float) -> List[Hashable]:
+        by_text = {key_text(k): k for k in keys}
+        if not by_text:
+            return []
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return list(by_text.values())
+            try:
+                # IMMEDIATE: the expiry sweep and the inserts see no other writer
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?)",
+                    [(namespace, text, LEASE_OWNER, now + ttl) for text in by_text],
+                )
+                texts = list(by_text)
+                held = []
+                for i in range(0, len(texts), _BATCH):
+                    batch = texts[i:i + _BATCH]
+                    held.extend(row[0] for row in conn.execute(
+                        "SELECT key FROM leases WHERE namespace = ? AND owner = ? "
+                        f"AND key IN ({','.join('?' * len(batch))})",
+                        (namespace, LEASE_OWNER, *batch),
+                    ))
+                conn.execute("COMMIT")
+                return [by_text[text] for text in held]
+            except sqlite3.Error as e:
+                print(f"Disk cache lease failed for {namespace}: {e}")
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                return list(by_text.values())
+
+    def release(self, namespace: str, keys: Iterable[Hashable]):
+        texts = [key_text(k) for k in keys]
+        for i in range(0, len(texts), _BATCH):
+            batch = texts[i:i + _BATCH]
+            self._execute(
+                "DELETE FROM leases WHERE namespace = ? AND owner = ? "
+                f"AND key IN ({','.join('?' * len(batch))})",
+                (namespace, LEASE_OWNER, *batch),
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,79 @@
+"""
+Columnar encoding of OHLCV history for the history endpoints.
+
+History is serialised column-wise straight from the bar-store DataFrame
+(no per-row dicts). Clients that send a matching Accept header get Arrow
+IPC or msgpack instead of JSON when the optional library is installed.
+"""
+
+from typing import Dict, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+def history_columns(df: pd.DataFrame) -> Dict[str, list]:
+    """OHLCV DataFrame -> {"time": [...], "open": [...], ...} with prices rounded to 2 decimals."""
+    return {
+        "time": df.index.strftime("%Y-%m-%d").tolist(),
+        "open": df["Open"].round(2).tolist(),
+        "high": df["High"].round(2).tolist(),
+        "low": df["Low"].round(2).tolist(),
+        "close": df["Close"].round(2).tolist(),
+        "volume": df["Volume"].fillna(0).astype("int64").tolist(),
+    }
+
+
+def history_records(columns: Dict[str, list]) -> list:
+    """Columnar history -> legacy list of per-bar dicts."""
+    keys = ["time"] + FIELDS
+    return [dict(zip(keys, row)) for row in zip(*(columns[k] for k in keys))]
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick a response encoding from the Accept header.
+
+    Returns:
+        "arrow", "msgpack" or "json" (binary formats only if installed)
+    """
+    accept = (accept or "").lower()
+    if pa is not None and ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if msgpack is not None and any(t in accept for t in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return "json"
+
+
+def encode_arrow(columns_by_symbol: Dict[str, Dict[str, list]]) -> bytes:
+    """One long-format Arrow IPC stream with a symbol column."""
+    table = pa.Table.from_pydict({
+        "symbol": [s for s, cols in columns_by_symbol.items() for _ in cols["time"]],
+        **{
+            key: [v for cols in columns_by_symbol.values() for v in cols[key]]
+            for key in ["time"] + FIELDS
+        },
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(payload: dict) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
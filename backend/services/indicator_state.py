@@ -0,0 +1,102 @@
+"""
+Persistent per-symbol incremental indicator state.
+
+Holds one IndicatorState (or any object with to_dict()) per symbol in
+memory and persists it as JSON under data/indicator_state/. Writes are
+batched: dirty states are flushed at most every FLUSH_INTERVAL seconds and
+once more on shutdown, so intraday polling does not rewrite every file.
+
+States are shared between requests: hold lock(symbol) while advancing or
+reading one.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import quote
+
+
+STATE_DIR = Path(__file__).parent.parent / "data" / "indicator_state"
+
+
+class IndicatorStateStore:
+    """In-memory indicator states per symbol with batched JSON persistence."""
+
+    FLUSH_INTERVAL = 60
+
+    def __init__(self, root: Path = STATE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._states: dict = {}
+        self._dirty: set = set()
+        self._symbol_locks: dict = {}
+        self._flushed_at = time.monotonic()
+
+    def lock(self, symbol: str) -> threading.Lock:
+        """The lock guarding one symbol's state."""
+        with self._lock:
+            return self._symbol_locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol: str) -> Path:
+        return self.root / f"{quote(symbol, safe='')}.json"
+
+    def get(self, symbol: str, from_dict: Callable[[dict], object]) -> Optional[object]:
+        """The state for a symbol, loading it from disk on first access."""
+        with self._lock:
+            if symbol in self._states:
+                return self._states[symbol]
+        try:
+            with open(self._path(symbol), "r", encoding="utf-8") as f:
+                state = from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Trasigt indikatortillstånd för {symbol}, bygger om: {e}")
+            return None
+        with self._lock:
+            return self._states.setdefault(symbol, state)
+
+    def put(self, symbol: str, state):
+        """Store (or mark as updated) a symbol's state."""
+        with self._lock:
+            self._states[symbol] = state
+            self._dirty.add(symbol)
+
+    def discard(self, symbol: str):
+        """Drop a symbol's state and file (call while holding lock(symbol))."""
+        with self._lock:
+            self._states.pop(symbol, None)
+            self._dirty.discard(symbol)
+        try:
+            self._path(symbol).unlink()
+        except FileNotFoundError:
+            pass
+
+    def flush(self, force: bool = False):
+        """Write dirty states to disk if FLUSH_INTERVAL has passed (or force)."""
+        with self._lock:
+            if not self._dirty or (not force and time.monotonic() - self._flushed_at < self.FLUSH_INTERVAL):
+                return
+            dirty = {s: self._states[s] for s in self._dirty}
+            self._dirty.clear()
+            self._flushed_at = time.monotonic()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        for symbol, state in dirty.items():
+            # Serialise and write under the symbol's lock (also keeps two flushes apart)
+            with self.lock(symbol):
+                with self._lock:
+                    # Discarded (or replaced, then dirty again) since the snapshot above
+                    if self._states.get(symbol) is not state:
+                        continue
+                path = self._path(symbol)
+                tmp = path.with_name(path.name + ".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(state.to_dict(), f)
+                os.replace(tmp, path)
+
+
+indicator_states = IndicatorStateStore()
@@ -0,0 +1,199 @@
+"""
+Trading-session calendar for Nasdaq Stockholm (XSTO) and NYSE (XNYS).
+
+Holidays and early closes are derived from fixed dates and Easter, so no
+data file needs updating each year. Cache lifetimes, the quote poller and
+bar-store freshness use this to avoid upstream calls while prices cannot
+change: data fetched after the close stays valid until the next open.
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+
+# Closing auctions and late prints keep changing the last bar for a while
+SETTLE = timedelta(minutes=15)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th given weekday of a month (n=-1 for the last one)."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _weekday_between(year: int, month: int, first_day: int, weekday: int) -> date:
+    """The given weekday in the 7-day window starting at month/first_day."""
+    start = date(year, month, first_day)
+    return start + timedelta(days=(weekday - start.weekday()) % 7)
+
+
+def _observed(day: date) -> date:
+    """US rule: Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _xsto_days(year: int) -> Tuple[set, set]:
+    easter = _easter(year)
+    holidays = {
+        date(year, 1, 1),
+        date(year, 1, 6),                                   # Trettondedag jul
+        easter - timedelta(days=2),                         # Långfredagen
+        easter + timedelta(days=1),                         # Annandag påsk
+        date(year, 5, 1),
+        easter + timedelta(days=39),                        # Kristi himmelsfärd
+        date(year, 6, 6),                                   # Nationaldagen
+        _weekday_between(year, 6, 19, 4),                   # Midsommarafton
+        date(year, 12, 24),
+        date(year, 12, 25),
+        date(year, 12, 26),
+        date(year, 12, 31),
+    }
+    early = {
+        date(year, 1, 5),
+        easter - timedelta(days=3),                         # Skärtorsdagen
+        date(year, 4, 30),
+        easter + timedelta(days=38),                        # Dagen före Kristi himmelsfärd
+        _weekday_between(year, 10, 30, 4),                  # Allhelgonaafton
+    }
+    return holidays, early - holidays
+
+
+def _xnys_days(year: int) -> Tuple[set, set]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),                        # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                        # Presidents' Day
+        _easter(year) - timedelta(days=2),                  # Good Friday
+        _nth_weekday(year, 5, 0, -1),                       # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),                        # Labor Day
+        _nth_weekday(year, 11, 3, 4),                       # Thanksgiving
+        _observed(date(year, 12, 25)),
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))          # Juneteenth
+    early = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),   # Day after Thanksgiving
+        date(year, 12, 24),
+    }
+    return holidays, early - holidays
+
+
+class MarketCalendar:
+    """Regular sessions, holidays and early closes for one exchange."""
+
+    def __init__(self, code: str, tz: str, open_time: time, close_time: time, early_close: time, rules):
+        self.code = code
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.early_close = early_close
+        self._rules = lru_cache(maxsize=None)(rules)
+
+    def _local(self, now: Optional[datetime]) -> datetime:
+        return (now or datetime.now(self.tz)).astimezone(self.tz)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self._rules(day.year)[0]
+
+    def session(self, day: date) -> Optional[Tuple[datetime, datetime]]:
+        """(open, close) for a trading day in exchange time, or None."""
+        if not self.is_trading_day(day):
+            return None
+        close = self.early_close if day in self._rules(day.year)[1] else self.close_time
+        return (
+            datetime.combine(day, self.open_time, tzinfo=self.tz),
+            datetime.combine(day, close, tzinfo=self.tz),
+        )
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        local = self._local(now)
+        session = self.session(local.date())
+        return session is not None and session[0] <= local < session[1]
+
+    def is_active(self, now: Optional[datetime] = None) -> bool:
+        """True while prices can still change: during a session and SETTLE after its close."""
+        local = self._local(now)
+        session = self.session(local.date())
+        return session is not None and session[0] <= local < session[1] + SETTLE
+
+    def next_open(self, now: Optional[datetime] = None) -> datetime:
+        """Start of the next session after now (now itself if the market just opened)."""
+        local = self._local(now)
+        day = local.date()
+        while True:
+            session = self.session(day)
+            if session is not None and session[0] >= local:
+                return session[0]
+            day += timedelta(days=1)
+
+    def last_close(self, now: Optional[datetime] = None) -> datetime:
+        """The most recent session close at or before now."""
+        local = self._local(now)
+        day = local.date()
+        while True:
+            session = self.session(day)
+            if session is not None and session[1] <= local:
+                return session[1]
+            day -= timedelta(days=1)
+
+    def last_settled(self, now: Optional[datetime] = None) -> datetime:
+        """When the latest finished session's prices became final (close + SETTLE)."""
+        return self.last_close(self._local(now) - SETTLE) + SETTLE
+
+
+CALENDARS: Dict[str, MarketCalendar] = {
+    "XSTO": MarketCalendar("XSTO", "Europe/Stockholm", time(9, 0), time(17, 30), time(13, 0), _xsto_days),
+    "XNYS": MarketCalendar("XNYS", "America/New_York", time(9, 30), time(16, 0), time(13, 0), _xnys_days),
+}
+
+
+def market_for(symbol: str) -> str:
+    """Exchange a symbol trades on: .ST symbols and ^OMX indices in Stockholm, everything else in the US."""
+    return "XSTO" if symbol.endswith(".ST") or symbol.startswith("^OMX") else "XNYS"
+
+
+def calendar_for(symbol: str) -> MarketCalendar:
+    return CALENDARS[market_for(symbol)]
+
+
+def any_active(markets: Iterable[str] = CALENDARS, now: Optional[datetime] = None) -> bool:
+    return any(CALENDARS[m].is_active(now) for m in markets)
+
+
+def valid_until(markets: Iterable[str] = CALENDARS, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    How long data for `markets` stays valid if fetched now: None while any
+    of them is active, otherwise the earliest next open among them.
+    """
+    markets = list(markets)
+    if any_active(markets, now):
+        return None
+    return min(CALENDARS[m].next_open(now) for m in markets)
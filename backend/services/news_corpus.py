@@ -0,0 +1,81 @@
+"""
+Shared RSS news corpus, fetched once per refresh interval.
+
+Every consumer (company news summaries, /api/news/feed, the briefing
+pipeline) reads the same in-memory list of articles instead of
+re-downloading every feed per company. Each refresh bumps `version`, so
+callers can key derived data on it. The corpus is also published to the
+shared cache, so a restart or another worker reuses a fresh download.
+
+Articles in the corpus are shared and must not be mutated; copy an
+article before adding fields to it.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from services.shared_cache import shared_cache
+
+
+class NewsCorpus:
+    """The latest list of articles from all configured feeds, newest first."""
+
+    REFRESH_SECONDS = 600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._articles: List[dict] = []
+        self.version = 0
+        self.fetched_at: Optional[float] = None  # epoch seconds
+
+    def _fresh(self) -> bool:
+        return self.fetched_at is not None and time.time() - self.fetched_at < self.REFRESH_SECONDS
+
+    def _replace(self, articles: List[dict], fetched_at: float):
+        with self._lock:
+            self._articles = articles
+            self.fetched_at = fetched_at
+            self.version += 1
+
+    def get(self, load: Callable[[], List[dict]]) -> Tuple[int, List[dict]]:
+        """
+        (version, articles), refreshing with `load()` when older than
+        REFRESH_SECONDS. Only one caller refreshes; the others keep reading
+        the previous corpus meanwhile (or wait for it if there is none yet).
+        """
+        if not self._fresh():
+            blocking = self.fetched_at is None
+            if self._refresh_lock.acquire(blocking=blocking):
+                try:
+                    if not self._fresh():
+                        self._refresh(load)
+                finally:
+                    self._refresh_lock.release()
+        with self._lock:
+            return self.version, self._articles
+
+    def articles(self, load: Callable[[], List[dict]]) -> List[dict]:
+        return self.get(load)[1]
+
+    def _refresh(self, load: Callable[[], List[dict]]):
+        # Another worker (or the previous process) may have fetched recently
+        stored = shared_cache.get("news", "corpus")
+        if stored and (self.fetched_at is None or stored[0][0] > self.fetched_at):
+            fetched_at, articles = stored[0]
+            if time.time() - fetched_at < self.REFRESH_SECONDS:
+                self._replace(articles, fetched_at)
+                return
+
+        fetched_at = time.time()
+        articles = load()
+        if not articles and self._articles:
+            # Every feed failed: keep serving the previous corpus until the next interval
+            print("No articles fetched, keeping the previous news corpus")
+            articles = self._articles
+        self._replace(articles, fetched_at)
+        shared_cache.put("news", "corpus", (fetched_at, articles), ttl=24 * 3600)
+
+
+news_corpus = NewsCorpus()
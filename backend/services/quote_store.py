@@ -0,0 +1,340 @@
+"""
+In-memory universe quote snapshot, refreshed by a background poller.
+
+The scheduler polls every tracked symbol during Stockholm and US trading
+sessions (see market_calendar; plus once after each close for the final
+prices) and stores the
+quotes here. /api/stocks/* reads only this store, so no request ever waits
+on Yahoo: universe symbols that are not tracked yet are adopted into the
+poll set and fetched in the background. Any other symbol a client asks for
+is fetched once in the background and kept in a small bounded side cache
+for ADHOC_SECONDS, but never added to the poll set.
+
+Every poll that changes something is also appended to a short changelog of
+per-symbol changed fields, which the SSE stream replays from Last-Event-ID.
+
+Polled quotes are published to the shared cache, so with several workers
+only the first one to poll within max_age calls upstream. Workers poll at
+the same moments, so each symbol is leased in the shared cache before it
+is fetched: the worker holding the lease fetches and publishes it, the
+others wait for that publish instead of calling upstream themselves.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from services.market_calendar import CALENDARS, market_for
+from services.shared_cache import shared_cache
+from services.universe import universe
+
+
+# Fields that change on every poll and are not worth pushing on their own
+_VOLATILE_FIELDS = {"timestamp"}
+
+
+def _changed_fields(previous: Optional[dict], quote: dict) -> dict:
+    """Fields of `quote` that differ from `previous` (all fields if new)."""
+    if not previous:
+        return dict(quote)
+    changed = {k: v for k, v in quote.items() if previous.get(k) != v}
+    if not set(changed) - _VOLATILE_FIELDS:
+        return {}
+    # A field that disappeared (e.g. a cleared error) is sent as None
+    changed.update({k: None for k in previous if k not in quote})
+    return changed
+
+
+def pending_quote(symbol: str) -> dict:
+    """Placeholder for a symbol whose first poll has not finished yet."""
+    return {"symbol": symbol, "error": f"Kursdata för {symbol} hämtas, försök igen strax", "pending": True}
+
+
+class QuoteStore:
+    """Latest quote per tracked symbol, written by the poller and read by routers."""
+
+    # Number of change events kept for Last-Event-ID replay
+    CHANGELOG_SIZE = 500
+    # How long published quotes stay in the shared cache
+    SHARE_SECONDS = 300
+    # Longest a worker may hold a symbol's fetch lease (an upstream poll takes less)
+    LEASE_SECONDS = 120
+    # How often a worker waiting on another worker's fetch re-checks the shared cache
+    LEASE_POLL_SECONDS = 0.5
+    # Symbols outside the universe: how long a one-off quote is served, and how many are kept
+    ADHOC_SECONDS = 60
+    ADHOC_MAX = 200
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, dict] = {}
+        self._fetched_at: Dict[str, datetime] = {}
+        self._tracked: Dict[str, None] = {}
+        self._fetch: Optional[Callable[[List[str]], Dict[str, dict]]] = None
+        self._adopting = False
+        # symbol -> (time.monotonic() of fetch, quote) for symbols outside the universe
+        self._adhoc: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._adhoc_pending: set = set()
+        self.updated_at: Optional[float] = None
+        # Event ids are "<boot>-<seq>" so ids from a previous process never match
+        self._boot = format(int(time.time()), "x")
+        self._seq = 0
+        self._changelog: deque = deque(maxlen=self.CHANGELOG_SIZE)
+        self._listeners: List[Callable[[Dict[str, dict]], None]] = []
+
+    def configure(self, fetch: Callable[[List[str]], Dict[str, dict]], symbols: Iterable[str]):
+        """Set the bulk quote function and the universe to poll."""
+        self._fetch = fetch
+        self.track(symbols)
+
+    def add_listener(self, callback: Callable[[Dict[str, dict]], None]):
+        """Call `callback(changes)` after every poll that changed something."""
+        self._listeners.append(callback)
+
+    def track(self, symbols: Iterable[str]):
+        with self._lock:
+            for symbol in symbols:
+                self._tracked.setdefault(symbol, None)
+
+    def invalidate(self, symbol: str):
+        """
+        Forget a symbol's quote, here and in the shared cache; a tracked
+        symbol is polled again on the next cycle. Until then it reads as
+        pending, recorded as a change so listeners and streams drop the old
+        quote too.
+        """
+        shared_cache.delete("quotes", symbol)
+        changes = {}
+        with self._lock:
+            self._fetched_at.pop(symbol, None)
+            self._adhoc.pop(symbol, None)
+            previous = self._quotes.pop(symbol, None)
+            if previous is not None:
+                pending = pending_quote(symbol)
+                self._quotes[symbol] = pending
+                changes[symbol] = _changed_fields(previous, pending)
+                self._record(changes)
+        self._notify(changes)
+
+    def _record(self, changes: Dict[str, dict]):
+        """Append a change event (caller holds the lock)."""
+        if changes:
+            self._seq += 1
+            self._changelog.append((self._seq, changes))
+
+    def _notify(self, changes: Dict[str, dict]):
+        for callback in self._listeners if changes else []:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Fel i kurslyssnare: {e}")
+
+    @property
+    def tracked(self) -> List[str]:
+        with self._lock:
+            return list(self._tracked)
+
+    def due_symbols(self, now: Optional[datetime] = None) -> List[str]:
+        """
+        Tracked symbols that need a poll: their market is active, they have no
+        quote yet, or their last quote predates the latest settled close.
+        """
+        now = now or datetime.now(ZoneInfo("UTC"))
+        closes = {market: cal.last_settled(now) for market, cal in CALENDARS.items()}
+        open_markets = {market for market, cal in CALENDARS.items() if cal.is_active(now)}
+        due = []
+        with self._lock:
+            for symbol in self._tracked:
+                market = market_for(symbol)
+                fetched = self._fetched_at.get(symbol)
+                if market in open_markets or fetched is None or fetched < closes[market]:
+                    due.append(symbol)
+        return due
+
+    def poll(self, symbols: Optional[List[str]] = None, max_age: Optional[float] = None) -> int:
+        """
+        Fetch quotes for `symbols` (default: all due symbols) and store them.
+
+        Returns:
+            Number of symbols polled
+        """
+        if self._fetch is None:
+            return 0
+        if symbols is None:
+            symbols = self.due_symbols()
+        if not symbols:
+            return 0
+
+        quotes = self._fetch_shared(symbols, max_age)
+        fetched_at = datetime.now(ZoneInfo("UTC"))
+        changes = {}
+        with self._lock:
+            for symbol, quote in quotes.items():
+                previous = self._quotes.get(symbol)
+                # Keep the last good quote if a poll fails for one symbol
+                if "error" in quote and previous and "error" not in previous:
+                    continue
+                changed = _changed_fields(previous, quote)
+                if changed:
+                    changes[symbol] = changed
+                self._quotes[symbol] = quote
+                self._fetched_at[symbol] = fetched_at
+            self._record(changes)
+            self.updated_at = time.monotonic()
+
+        self._notify(changes)
+        return len(symbols)
+
+    def _fetch_shared(self, symbols: List[str], max_age: Optional[float]) -> Dict[str, dict]:
+        """
+        Quotes another worker fetched within max_age, and upstream for the
+        rest. Symbols another worker is fetching right now (it holds their
+        lease) are waited for rather than fetched again.
+        """
+        if not max_age:
+            return self._fetch_and_publish(symbols, max_age)
+
+        quotes = {}
+        pending = list(symbols)
+        deadline = time.monotonic() + self.LEASE_SECONDS
+        while True:
+            quotes.update(self._read_shared(pending, max_age))
+            pending = [s for s in pending if s not in quotes]
+            if not pending:
+                return quotes
+            mine = shared_cache.claim("quote_leases", pending, self.LEASE_SECONDS)
+            if mine:
+                try:
+                    quotes.update(self._fetch_and_publish(mine, max_age))
+                finally:
+                    shared_cache.release("quote_leases", mine)
+                pending = [s for s in pending if s not in quotes]
+                if not pending:
+                    return quotes
+            if time.monotonic() >= deadline:
+                # The lease holder never published: fetch the rest ourselves
+                quotes.update(self._fetch_and_publish(pending, max_age))
+                return quotes
+            time.sleep(self.LEASE_POLL_SECONDS)
+
+    @staticmethod
+    def _read_shared(symbols: List[str], max_age: float) -> Dict[str, dict]:
+        quotes = {}
+        now = time.time()
+        for symbol, (entry, _, _) in shared_cache.get_many("quotes", symbols).items():
+            published, quote = entry
+            if now - published <= max_age:
+                quotes[symbol] = quote
+        return quotes
+
+    def _fetch_and_publish(self, symbols: List[str], max_age: Optional[float]) -> Dict[str, dict]:
+        fetched = self._fetch(symbols, max_age)
+        published = time.time()
+        # Errors too, so workers waiting on this fetch do not request them
+        # again; readers only take quotes younger than their max_age
+        shared_cache.put_many(
+            "quotes", {s: (published, q) for s, q in fetched.items()}, ttl=self.SHARE_SECONDS
+        )
+        return fetched
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self._boot}-{self._seq}"
+
+    def changes_since(self, event_id: Optional[str]) -> Optional[List[Tuple[str, Dict[str, dict]]]]:
+        """
+        Change events after `event_id`, oldest first, as (event_id, changes).
+
+        Returns:
+            None if event_id is unknown or too old to replay (send a snapshot)
+        """
+        if not event_id:
+            return None
+        boot, _, seq = event_id.partition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        with self._lock:
+            if seq > self._seq:
+                return None
+            events = list(self._changelog)
+        if seq < self._seq and (not events or events[0][0] > seq + 1):
+            return None
+        return [(f"{self._boot}-{n}", changes) for n, changes in events if n > seq]
+
+    def get(self, symbol: str) -> dict:
+        return self.get_many([symbol])[symbol]
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, dict]:
+        """
+        Stored quotes for `symbols`. Never calls upstream: unknown symbols are
+        adopted into the poll set, fetched in the background and returned as
+        pending placeholders until then.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        with self._lock:
+            result = {s: self._quotes[s] for s in symbols if s in self._quotes}
+            adopt, adhoc = [], []
+            now = time.monotonic()
+            for symbol in symbols:
+                if symbol in result or symbol in self._tracked:
+                    continue
+                if universe.get(symbol) is not None:
+                    self._tracked[symbol] = None
+                    adopt.append(symbol)
+                    continue
+                entry = self._adhoc.get(symbol)
+                if entry is not None:
+                    result[symbol] = entry[1]
+                    self._adhoc.move_to_end(symbol)
+                if (entry is None or now - entry[0] >= self.ADHOC_SECONDS) and symbol not in self._adhoc_pending:
+                    adhoc.append(symbol)
+            self._adhoc_pending.update(adhoc)
+        if adopt:
+            self._poll_in_background(adopt)
+        if adhoc:
+            self._fetch_adhoc_in_background(adhoc)
+        return {s: result.get(s) or pending_quote(s) for s in symbols}
+
+    def _fetch_adhoc_in_background(self, symbols: List[str]):
+        """One-off fetch for symbols outside the universe; they are not tracked."""
+        def run():
+            try:
+                quotes = self._fetch_shared(symbols, self.ADHOC_SECONDS) if self._fetch else {}
+                fetched = time.monotonic()
+                with self._lock:
+                    for symbol, quote in quotes.items():
+                        self._adhoc[symbol] = (fetched, quote)
+                        self._adhoc.move_to_end(symbol)
+                    while len(self._adhoc) > self.ADHOC_MAX:
+                        self._adhoc.popitem(last=False)
+            except Exception as e:
+                print(f"Fel vid hämtning av symboler utanför universumet: {e}")
+            finally:
+                with self._lock:
+                    self._adhoc_pending.difference_update(symbols)
+
+        threading.Thread(target=run, name="quote-adhoc", daemon=True).start()
+
+    def _poll_in_background(self, symbols: List[str]):
+        with self._lock:
+            if self._adopting:
+                # The regular poll picks these up, they have no quote yet
+                return
+            self._adopting = True
+
+        def run():
+            try:
+                self.poll(symbols)
+            except Exception as e:
+                print(f"Fel vid hämtning av nya symboler: {e}")
+            finally:
+                self._adopting = False
+
+        threading.Thread(target=run, name="quote-adopt", daemon=True).start()
+
+
+quote_store = QuoteStore()
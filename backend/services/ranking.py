@@ -0,0 +1,112 @@
+"""
+Materialised, globally sorted ranking of the whole universe.
+
+Rows for every stock with a valid quote are built once per quote or
+universe change and pre-sorted per segment, sort key and direction, so
+any /api/stocks/all page is a slice of a ready-made list.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from services.quote_store import quote_store
+from services.universe import SEGMENTS, universe
+
+
+# Sort keys kept pre-sorted ("price" is accepted as an alias for current_price)
+SORT_KEYS = ("change_percent", "volume_vs_avg", "current_price")
+SORT_ALIASES = {"price": "current_price"}
+
+
+def stock_row(stock: dict, data: dict) -> dict:
+    """Combine static stock metadata with quote data."""
+    return {
+        "symbol": stock["symbol"],
+        "name": stock["name"],
+        "market": stock.get("market", "OMX Stockholm"),
+        "cap_size": stock.get("cap_size", ""),
+        "current_price": data.get("current_price", 0),
+        "change_percent": data.get("change_percent", 0),
+        "volume_vs_avg": data.get("volume_vs_avg", 1),
+        "currency": data.get("currency", "SEK"),
+        "high_52w": data.get("high_52w"),
+        "low_52w": data.get("low_52w"),
+        "error": data.get("error"),
+    }
+
+
+def _sort_value(row: dict, key: str):
+    return row.get(key, 0) or 0
+
+
+class RankingView:
+    """Pre-sorted rows per (segment, sort key, direction)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_for: Optional[Tuple] = None
+        self._rows: List[dict] = []
+        self._sorted: Dict[Tuple[Optional[str], str, bool], List[dict]] = {}
+
+    def _stamp(self) -> Tuple:
+        return (quote_store.last_event_id, universe.version)
+
+    def refresh(self, force: bool = False):
+        """Rebuild if quotes or the universe changed since the last build."""
+        stamp = self._stamp()
+        if not force and stamp == self._built_for:
+            return
+        with self._lock:
+            if not force and stamp == self._built_for:
+                return
+            stocks = universe.stocks()
+            quotes = quote_store.get_many(s["symbol"] for s in stocks)
+            rows = [stock_row(s, quotes[s["symbol"]]) for s in stocks]
+            # Only include stocks with a valid price
+            rows = [r for r in rows if (r.get("current_price") or 0) > 0]
+
+            ordered = {}
+            for cap in (None, *SEGMENTS):
+                segment = rows if cap is None else [r for r in rows if r["cap_size"] == cap]
+                for key in SORT_KEYS:
+                    for desc in (True, False):
+                        ordered[(cap, key, desc)] = sorted(
+                            segment, key=lambda r: _sort_value(r, key), reverse=desc
+                        )
+
+            self._rows = rows
+            self._sorted = ordered
+            self._built_for = stamp
+
+    def page(
+        self,
+        cap: Optional[str] = None,
+        search: Optional[str] = None,
+        sort_by: Optional[str] = "change_percent",
+        sort_desc: bool = True,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[dict], int]:
+        """
+        One page of the global ranking.
+
+        Returns:
+            (rows on the page, total rows matching the filters)
+        """
+        self.refresh()
+        key = SORT_ALIASES.get(sort_by, sort_by)
+
+        if key in SORT_KEYS:
+            ordered = self._sorted.get((cap, key, sort_desc), [])
+        else:
+            segment = self._rows if cap is None else [r for r in self._rows if r["cap_size"] == cap]
+            ordered = sorted(segment, key=lambda r: _sort_value(r, key), reverse=sort_desc) if key else segment
+
+        if search:
+            matches = {s["symbol"] for s in universe.search(search, cap)}
+            ordered = [r for r in ordered if r["symbol"] in matches]
+
+        return ordered[offset:offset + limit], len(ordered)
+
+
+ranking = RankingView()
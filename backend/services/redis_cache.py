@@ -0,0 +1,251 @@
+"""
+Redis implementation of the shared L2 cache, with a minimal RESP client.
+
+Lets several uvicorn workers (or hosts) share one cache. Only the handful
+of commands the cache needs are used (GET/MGET/SET/DEL/SCAN/EVAL,
+AUTH/SELECT), so any Redis-protocol server works: redis-server, Valkey,
+KeyDB or a fake. Entries expire in Redis itself at the end of their stale
+window. Leases are SET NX PX keys.
+
+Values are pickled, so every blob is signed with HMAC-SHA256 under a shared
+secret and entries with a bad signature are ignored: whoever can write to
+the Redis server cannot make the workers unpickle arbitrary data.
+
+Configured by REDIS_URL (redis://[:password@]host[:port][/db]).
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+from services.cache_backend import (
+    FORMAT, LEASE_OWNER, CacheBackend, Entry, dumps, expiry, key_text, loads, sign, usable, verified,
+)
+
+
+REDIS_TIMEOUT = float(os.environ.get("REDIS_TIMEOUT", "2"))
+
+# Seconds to wait before reconnecting after a connection failure
+_RETRY_AFTER = 5
+
+# Deletes a lease only if this process still holds it
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class RedisError(Exception):
+    """Error reply from the server."""
+
+
+def _escape_glob(text: str) -> str:
+    return "".join("\\" + c if c in "*?[]\\" else c for c in text)
+
+
+class RespClient:
+    """One blocking RESP2 connection; commands from all threads are serialised."""
+
+    def __init__(self, url: str, timeout: float = REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock = sock
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._file = sock.makefile("rb")
+            if self.password:
+                auth = ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)
+                self._roundtrip([auth])
+            if self.db:
+                self._roundtrip([("SELECT", self.db)])
+        except BaseException:
+            # Never reuse a connection that is not authenticated / on the right db
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._file = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Redis closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"Unexpected RESP reply: {line[:20]!r}")
+
+    def _roundtrip(self, commands: List[tuple]) -> list:
+        self._sock.sendall(b"".join(self._encode(c) for c in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """Send several commands in one write and return their replies in order."""
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                return self._roundtrip(commands)
+            except (OSError, ConnectionError):
+                self._disconnect()
+                raise
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+class RedisCache(CacheBackend):
+    """Signed, pickled entries under "<prefix><namespace>|<key>" keys in Redis."""
+
+    name = "redis"
+
+    def __init__(self, url: str, secret: bytes, prefix: str = "nordpuls:"):
+        self.client = RespClient(url)
+        self.secret = secret
+        self.prefix = prefix
+        self._down_until = 0.0
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}{namespace}|{key_text(key)}"
+
+    def _call(self, commands: List[tuple]) -> Optional[list]:
+        """Run commands; on connection or server errors log, back off and return None."""
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return self.client.pipeline(commands)
+        except (OSError, ConnectionError, RedisError) as e:
+            print(f"Redis cache unavailable: {e}")
+            self._down_until = time.monotonic() + _RETRY_AFTER
+            return None
+
+    def get_many(self, namespace: str, keys: Iterable[Hashable]) -> Dict[Hashable, Entry]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        replies = self._call([("MGET", *(self._key(namespace, k) for k in keys))])
+        if replies is None:
+            return {}
+        result = {}
+        for key, blob in zip(keys, replies[0]):
+            if blob is None:
+                continue
+            blob = verified(self.secret, blob)
+            if blob is None:
+                print(f"Redis cache entry {namespace}/{key_text(key)} has a bad signature, ignoring it")
+                continue
+            try:
+                fmt, value, expires_at, stale_until = loads(blob)
+            except Exception as e:
+                print(f"Unreadable redis cache entry {namespace}/{key_text(key)}: {e}")
+                continue
+            if fmt == FORMAT and usable(stale_until):
+                result[key] = (value, expires_at, stale_until)
+        return result
+
+    def put_many(self, namespace: str, items: Dict[Hashable, object], ttl: Optional[float] = None, stale_ttl: float = 0):
+        expires_at, stale_until = expiry(ttl, stale_ttl)
+        commands = []
+        for key, value in items.items():
+            blob = dumps((FORMAT, value, expires_at, stale_until))
+            if blob is None:
+                continue
+            command = ("SET", self._key(namespace, key), sign(self.secret, blob))
+            if stale_until is not None:
+                command += ("PX", max(1, int((stale_until - time.time()) * 1000)))
+            commands.append(command)
+        if commands:
+            self._call(commands)
+
+    def _scan_delete(self, match: str) -> int:
+        removed, cursor = 0, "0"
+        while True:
+            replies = self._call([("SCAN", cursor, "MATCH", match, "COUNT", 500)])
+            if replies is None:
+                return removed
+            cursor, found = replies[0]
+            cursor = cursor.decode()
+            if found:
+                deleted = self._call([("DEL", *found)])
+                removed += deleted[0] if deleted else 0
+            if cursor == "0":
+                return removed
+
+    def delete(self, namespace: str, key: Hashable = None) -> int:
+        if key is None:
+            return self._scan_delete(_escape_glob(f"{self.prefix}{namespace}|") + "*")
+        replies = self._call([("DEL", self._key(namespace, key))])
+        return replies[0] if replies else 0
+
+    def delete_matching(self, namespace: str, pattern: str) -> int:
+        return self._scan_delete(_escape_glob(f"{self.prefix}{namespace}|") + pattern)
+
+    def _lease_key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}lease:{namespace}|{key_text(key)}"
+
+    def claim(self, namespace: str, keys: Iterable[Hashable], ttl: float) -> List[Hashable]:
+        keys = list(keys)
+        if not keys:
+            return []
+        ms = max(1, int(ttl * 1000))
+        replies = self._call([
+            ("SET", self._lease_key(namespace, k), LEASE_OWNER, "NX", "PX", ms) for k in keys
+        ])
+        if replies is None:
+            return keys
+        return [k for k, reply in zip(keys, replies) if reply == "OK"]
+
+    def release(self, namespace: str, keys: Iterable[Hashable]):
+        commands = [("EVAL", _RELEASE_SCRIPT, 1, self._lease_key(namespace, k), LEASE_OWNER) for k in keys]
+        if commands:
+            self._call(commands)
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,147 @@
+"""
+Daily reference-data cache for slow-changing ticker.info fields.
+
+ticker.info is the slowest Yahoo call, and quotes only need a handful of
+its fields (name, 52-week range, market cap, currency). They are fetched
+once per trading day in the background, persisted to data/reference_data.json
+and merged into quote responses, so the price path never calls .info.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import yfinance as yf
+
+from services.upstream import yahoo
+
+
+REFERENCE_PATH = Path(__file__).parent.parent / "data" / "reference_data.json"
+
+# ticker.info key -> key in our quote dicts
+INFO_FIELDS = {
+    "shortName": "name",
+    "fiftyTwoWeekHigh": "high_52w",
+    "fiftyTwoWeekLow": "low_52w",
+    "marketCap": "market_cap",
+    "currency": "currency",
+}
+
+
+def _fetch_info(symbol: str) -> dict:
+    """Fetch the reference fields for one symbol, or {} on failure."""
+    try:
+        info = yahoo.call(lambda: yf.Ticker(symbol).info) or {}
+    except Exception as e:
+        print(f"Fel vid hämtning av referensdata för {symbol}: {e}")
+        return {}
+    return {ours: info.get(theirs) for theirs, ours in INFO_FIELDS.items() if info.get(theirs) is not None}
+
+
+def default_fields(symbol: str) -> dict:
+    """Fallback values used until a symbol's reference data is loaded."""
+    return {
+        "name": symbol,
+        "high_52w": None,
+        "low_52w": None,
+        "market_cap": None,
+        "currency": "SEK" if symbol.endswith(".ST") else "USD",
+    }
+
+
+class ReferenceDataCache:
+    """Persistent per-symbol reference data, refreshed once per trading day."""
+
+    def __init__(self, path: Path = REFERENCE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._data: dict = {}
+        self._updated: dict = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self._data = stored.get("data", {})
+            self._updated = stored.get("updated", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Kunde inte läsa referensdata: {e}")
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            payload = {"data": dict(self._data), "updated": dict(self._updated)}
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def get(self, symbol: str) -> dict:
+        """Reference fields for a symbol, falling back to defaults."""
+        return {**default_fields(symbol), **self._data.get(symbol, {})}
+
+    def get_many(self, symbols: list) -> dict:
+        """
+        Reference fields for many symbols. Never blocks on upstream: symbols
+        that have never been loaded get defaults and a background refresh.
+        """
+        missing = [s for s in symbols if s not in self._updated]
+        if missing:
+            self.refresh_in_background(missing)
+        return {s: self.get(s) for s in symbols}
+
+    def stale_symbols(self, symbols: list = None) -> list:
+        """Symbols not refreshed yet today."""
+        today = date.today().isoformat()
+        if symbols is None:
+            symbols = list(self._updated)
+        return [s for s in symbols if self._updated.get(s) != today]
+
+    def refresh(self, symbols: list = None, force: bool = False):
+        """Fetch reference data for stale (or all, with force) symbols."""
+        if symbols is None:
+            symbols = list(self._updated)
+        if not force:
+            symbols = self.stale_symbols(symbols)
+        if not symbols:
+            return
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            fetched = dict(zip(symbols, executor.map(_fetch_info, symbols)))
+
+        today = date.today().isoformat()
+        with self._lock:
+            for symbol, fields in fetched.items():
+                if fields:
+                    self._data[symbol] = fields
+                # Mark failures too so they are retried tomorrow, not per request
+                self._updated[symbol] = today
+        self._save()
+        print(f"Referensdata uppdaterad för {len(fetched)} symboler")
+
+    def refresh_in_background(self, symbols: list = None, force: bool = False):
+        """Run refresh() in a daemon thread unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(symbols, force=force)
+            except Exception as e:
+                print(f"Fel vid uppdatering av referensdata: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="reference-data-refresh", daemon=True).start()
+
+
+reference_data = ReferenceDataCache()
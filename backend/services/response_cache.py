@@ -0,0 +1,141 @@
+"""
+Precomputed JSON responses with ETag / If-None-Match support.
+
+Polled endpoints whose data changes every few minutes at most register a
+response under a key together with the objects (or version stamps) it was
+built from. While those sources are unchanged, the serialised body, its
+gzip form and content-hash ETags are reused: a repeat poll costs a
+dictionary lookup, and a poll that sends the current ETag gets a 304
+without a body. The gzip form is a different representation, so it has
+its own strong ETag (the identity tag with a "-gz" suffix).
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+# Keys kept (e.g. one per query-parameter combination), least recently used evicted
+MAX_RESPONSES = 512
+
+_STAMP_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """True if an Accept-Encoding header allows gzip (q-values honoured, gzip;q=0 refuses)."""
+    explicit, wildcard = None, None
+    for item in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            explicit = max(explicit or 0.0, q)
+        elif coding == "*":
+            wildcard = q
+    if explicit is not None:
+        return explicit > 0
+    return bool(wildcard)
+
+
+def _same(a, b) -> bool:
+    """Sources match if they are the same object, or equal version stamps."""
+    if a is b:
+        return True
+    if isinstance(a, _STAMP_TYPES) and isinstance(b, _STAMP_TYPES):
+        return a == b
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return False
+
+
+class PreparedResponse:
+    """Serialised JSON body, its gzip form and their ETags."""
+
+    __slots__ = ("body", "gzipped", "etag", "gzip_etag")
+
+    def __init__(self, data):
+        self.body = json.dumps(
+            jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.gzipped = gzip.compress(self.body, 6) if len(self.body) >= GZIP_MIN_BYTES else None
+        digest = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"' if self.gzipped is not None else None
+
+    @staticmethod
+    def matches(etag: str, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as If-None-Match requires
+        tags = (t.strip().removeprefix("W/") for t in if_none_match.split(","))
+        return etag in tags
+
+    def to_response(self, request: Request) -> Response:
+        gzipped = self.gzipped is not None and accepts_gzip(request.headers.get("accept-encoding", ""))
+        etag = self.gzip_etag if gzipped else self.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if self.matches(etag, request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzipped, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """Prepared responses per key, rebuilt only when their sources change."""
+
+    def __init__(self, max_entries: int = MAX_RESPONSES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (sources, prepared); holding the sources keeps their ids unique
+        self._entries: "OrderedDict[Hashable, Tuple[tuple, PreparedResponse]]" = OrderedDict()
+
+    def prepared(self, key: Hashable, sources: tuple, build: Callable[[], object]) -> PreparedResponse:
+        """
+        The prepared response for `key`, calling `build()` to produce the data
+        only if `sources` (objects compared by identity, or version stamps)
+        differ from the ones it was last built from.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and _same(entry[0], sources):
+                self._entries.move_to_end(key)
+                return entry[1]
+        prepared = PreparedResponse(build())
+        with self._lock:
+            self._entries[key] = (sources, prepared)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def respond(self, request: Request, key: Hashable, sources: tuple, build: Callable[[], object]) -> Response:
+        """prepared(...) as a response: 304 if the client has it, else the (gzipped) body."""
+        return self.prepared(key, sources, build).to_response(request)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+responses = ResponseCache()
@@ -4,33 +4,56 @@ APScheduler setup for morning/evening briefings.
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import json
+import os
+import threading
 from pathlib import Path
 
 from agents.briefing_engine import BriefingEngine
-
-# In-memory store for generated briefings
+from agents.stock_data import StockDataFetcher
+from services.cache import clear_expired
+from services.shared_cache import shared_cache
+from services.quote_store import quote_store
+from services.ranking import ranking
+from services.top_movers import top_movers
+from services.reference_data import reference_data
+from services.universe import universe
+
+# Seconds between quote polls while a market is open
+QUOTE_POLL_SECONDS = int(os.environ.get("QUOTE_POLL_SECONDS", "60"))
+
+# Generated briefings, mirrored to the shared cache so they survive restarts
 _briefing_store: dict = {
     "morning": None,
     "evening": None,
     "history": [],
 }
+_stored = shared_cache.get("briefings", "store")
+if _stored:
+    _briefing_store.update(_stored[0])
 
 _scheduler: BackgroundScheduler = None
 _engine: BriefingEngine = None
+# The warm-up and the scheduled job both poll; never at the same time
+_poll_lock = threading.Lock()
+
+
+def remember_briefing(briefing_type: str, briefing: dict):
+    """Store a generated briefing as the latest of its type and persist the store."""
+    _briefing_store[briefing_type] = briefing
+    _briefing_store["history"].insert(0, briefing)
+    # Keep last 20 briefings
+    _briefing_store["history"] = _briefing_store["history"][:20]
+    shared_cache.put("briefings", "store", _briefing_store)
 
 
 def _generate_morning():
     """Scheduled job: generate morning briefing at 08:15 CET."""
-    global _briefing_store
     print(f"[{datetime.now()}] Generating morning briefing...")
     try:
-        briefing = _engine.generate_briefing("morning")
-        _briefing_store["morning"] = briefing
-        _briefing_store["history"].insert(0, briefing)
-        # Keep last 20 briefings
-        _briefing_store["history"] = _briefing_store["history"][:20]
+        remember_briefing("morning", _engine.generate_briefing("morning"))
         print(f"[{datetime.now()}] Morning briefing generated successfully")
     except Exception as e:
         print(f"[{datetime.now()}] Error generating morning briefing: {e}")
@@ -38,18 +61,59 @@ def _generate_morning():
 
 def _generate_evening():
     """Scheduled job: generate evening briefing at 17:15 CET."""
-    global _briefing_store
     print(f"[{datetime.now()}] Generating evening briefing...")
     try:
-        briefing = _engine.generate_briefing("evening")
-        _briefing_store["evening"] = briefing
-        _briefing_store["history"].insert(0, briefing)
-        _briefing_store["history"] = _briefing_store["history"][:20]
+        remember_briefing("evening", _engine.generate_briefing("evening"))
         print(f"[{datetime.now()}] Evening briefing generated successfully")
     except Exception as e:
         print(f"[{datetime.now()}] Error generating evening briefing: {e}")
 
 
+def _refresh_reference_data():
+    """Scheduled job: refresh ticker.info reference fields once per trading day."""
+    print(f"[{datetime.now()}] Refreshing reference data...")
+    try:
+        reference_data.refresh(universe.symbols())
+    except Exception as e:
+        print(f"[{datetime.now()}] Error refreshing reference data: {e}")
+
+
+def _poll_quotes():
+    """Scheduled job: refresh the in-memory quote snapshot for open markets."""
+    if not _poll_lock.acquire(blocking=False):
+        return
+    try:
+        # Pick up symbols added to the universe config since the last poll
+        quote_store.track(universe.symbols())
+        # Re-sync bars every poll, not just every StockDataFetcher.SYNC_INTERVAL
+        polled = quote_store.poll(max_age=QUOTE_POLL_SECONDS / 2)
+        if polled:
+            # Re-sort the /all ranking now rather than on the next request
+            ranking.refresh()
+            print(f"[{datetime.now()}] Polled quotes for {polled} symbols")
+    except Exception as e:
+        print(f"[{datetime.now()}] Error polling quotes: {e}")
+    finally:
+        _poll_lock.release()
+
+
+def warm_quotes():
+    """Warm-up step: first poll of the whole universe, then build the ranking views."""
+    with _poll_lock:
+        quote_store.track(universe.symbols())
+        polled = quote_store.poll(max_age=QUOTE_POLL_SECONDS / 2)
+    ranking.refresh()
+    top_movers.top()
+    print(f"[{datetime.now()}] Warm-up polled quotes for {polled} symbols")
+
+
+def _purge_cache():
+    """Scheduled job: drop expired response-cache entries."""
+    removed = clear_expired()
+    if removed:
+        print(f"[{datetime.now()}] Purged {removed} expired cache entries")
+
+
 def get_briefing(briefing_type: str) -> dict:
     """Get the latest briefing of a given type, generating if needed."""
     stored = _briefing_store.get(briefing_type)
@@ -59,8 +123,7 @@ def get_briefing(briefing_type: str) -> dict:
     # Generate on demand if none cached
     if _engine:
         briefing = _engine.generate_briefing(briefing_type)
-        _briefing_store[briefing_type] = briefing
-        _briefing_store["history"].insert(0, briefing)
+        remember_briefing(briefing_type, briefing)
         return briefing
 
     return {"error": "Briefing engine not initialized"}
@@ -114,8 +177,38 @@ def setup_scheduler():
         name="Evening Briefing",
     )
 
+    # Reference data (names, 52w range, market cap) before the Stockholm open
+    _scheduler.add_job(
+        _refresh_reference_data,
+        CronTrigger(day_of_week="mon-fri", hour=7, minute=30, timezone="Europe/Stockholm"),
+        id="reference_data",
+        name="Reference Data Refresh",
+    )
+
+    # Universe quotes while Stockholm or US is trading (the first poll is part of the warm-up)
+    quote_store.configure(StockDataFetcher().get_stock_infos, universe.symbols())
+    _scheduler.add_job(
+        _poll_quotes,
+        IntervalTrigger(seconds=QUOTE_POLL_SECONDS),
+        id="quote_poller",
+        name="Quote Poller",
+        max_instances=1,
+        coalesce=True,
+    )
+
+    _scheduler.add_job(
+        _purge_cache,
+        IntervalTrigger(minutes=10),
+        id="cache_purge",
+        name="Cache Purge",
+    )
+
     _scheduler.start()
     print("Scheduler started: morning briefing at 08:15, evening at 17:15 (Europe/Stockholm)")
+    print(f"Quote poller: every {QUOTE_POLL_SECONDS}s during market hours")
+
+    # Catch up in the background if today's reference data is missing
+    reference_data.refresh_in_background(universe.symbols())
 
 
 def shutdown_scheduler():
@@ -0,0 +1,34 @@
+"""
+The process-wide shared L2 cache backend.
+
+CACHE_BACKEND selects it: "sqlite" (default, data/cache.sqlite, shared by
+the workers on one host) or "redis" (REDIS_URL, shared across hosts).
+Redis entries are signed with CACHE_SECRET, which every worker must share;
+without it the SQLite backend is used.
+"""
+
+import os
+
+from services.cache_backend import CacheBackend
+from services.disk_cache import DiskCache
+from services.redis_cache import RedisCache
+
+
+def backend_from_env() -> CacheBackend:
+    kind = os.environ.get("CACHE_BACKEND", "sqlite").lower()
+    if kind == "redis":
+        secret = os.environ.get("CACHE_SECRET")
+        if secret:
+            return RedisCache(
+                os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+                secret.encode("utf-8"),
+                prefix=os.environ.get("REDIS_PREFIX", "nordpuls:"),
+            )
+        print("CACHE_BACKEND=redis needs CACHE_SECRET to sign entries, using sqlite")
+        return DiskCache()
+    if kind != "sqlite":
+        print(f"Unknown CACHE_BACKEND {kind!r}, using sqlite")
+    return DiskCache()
+
+
+shared_cache = backend_from_env()
@@ -0,0 +1,122 @@
+"""
+Incrementally maintained top movers per universe segment.
+
+Each segment keeps its stocks in a list sorted by change_percent. The
+quote poller reports which symbols changed and only those entries are
+moved (bisect), so reading the top gainers/losers of one or more
+segments costs O(limit) instead of a fetch-and-sort of the whole list.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.quote_store import quote_store
+from services.ranking import stock_row
+from services.universe import SEGMENTS, universe
+
+
+# Fields whose change can move a stock in (or out of) the ranking
+_RANK_FIELDS = {"change_percent", "current_price", "error"}
+
+
+class TopMovers:
+    """Per-segment lists of (change_percent, -position, symbol), ascending."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._universe_version = None
+        # Bumped whenever a ranking or any field of a ranked stock may have
+        # changed (response ETags key on it)
+        self.version = 0
+        self._sorted: Dict[str, List[Tuple[float, int, str]]] = {}
+        # (segment, symbol) -> current key in that segment's list
+        self._keys: Dict[Tuple[str, str], Tuple[float, int, str]] = {}
+        self._stocks: Dict[str, dict] = {}
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self._segments_of: Dict[str, List[str]] = {}
+
+    def _rebuild(self):
+        """Index the whole universe from the quote store (startup / config reload)."""
+        self._sorted = {cap: [] for cap in SEGMENTS}
+        self._keys = {}
+        self._stocks = {}
+        self._positions = {}
+        self._segments_of = {}
+        for position, stock in enumerate(universe.stocks()):
+            cap = stock["cap_size"]
+            symbol = stock["symbol"]
+            if (cap, symbol) in self._positions:
+                continue
+            self._positions[(cap, symbol)] = position
+            self._stocks.setdefault(symbol, stock)
+            self._segments_of.setdefault(symbol, []).append(cap)
+
+        quotes = quote_store.get_many(self._segments_of)
+        for symbol, quote in quotes.items():
+            self._place(symbol, quote)
+        self._universe_version = universe.version
+        self.version += 1
+
+    def _place(self, symbol: str, quote: dict):
+        for cap in self._segments_of.get(symbol, []):
+            old = self._keys.pop((cap, symbol), None)
+            entries = self._sorted[cap]
+            if old is not None:
+                del entries[bisect_left(entries, old)]
+            # Only include stocks with a valid price
+            if (quote.get("current_price") or 0) > 0:
+                key = (quote.get("change_percent", 0) or 0, -self._positions[(cap, symbol)], symbol)
+                insort(entries, key)
+                self._keys[(cap, symbol)] = key
+
+    def _ensure_current(self):
+        if self._universe_version != universe.version:
+            self._rebuild()
+
+    def apply(self, changes: Dict[str, dict]):
+        """
+        Quote-store listener: move only symbols whose rank inputs changed,
+        but bump `version` on any change to a universe stock, since rows
+        also show fields (52-week range, volume) that do not affect rank.
+        """
+        with self._lock:
+            if self._universe_version is None:
+                return
+            if self._universe_version != universe.version:
+                self._rebuild()
+                return
+            changed = {s: fields for s, fields in changes.items() if s in self._segments_of}
+            if not changed:
+                return
+            moved = [s for s, fields in changed.items() if _RANK_FIELDS & set(fields)]
+            for symbol, quote in quote_store.get_many(moved).items():
+                self._place(symbol, quote)
+            self.version += 1
+
+    def top(self, segments: Optional[Iterable[str]] = None, limit: int = 10) -> dict:
+        """
+        Top gainers and losers across `segments` (default: all).
+
+        Returns:
+            {"gainers": [...], "losers": [...]} rows like /api/stocks/all
+        """
+        with self._lock:
+            self._ensure_current()
+            lists = [self._sorted.get(cap, []) for cap in (segments or SEGMENTS)]
+            gainers = list(islice(heapq.merge(*(reversed(l) for l in lists), reverse=True), limit))
+            losers = list(islice(heapq.merge(*lists), limit))
+
+        symbols = {key[2] for key in gainers + losers}
+        quotes = quote_store.get_many(symbols)
+        row = lambda key: stock_row(self._stocks[key[2]], quotes[key[2]])
+        return {
+            "gainers": [row(k) for k in gainers],
+            "losers": [row(k) for k in losers],
+        }
+
+
+top_movers = TopMovers()
+quote_store.add_listener(top_movers.apply)
@@ -0,0 +1,167 @@
+"""
+In-memory index of the stock universe (config/omx_stockholm.json + watchlist).
+
+Loaded once and reloaded only when either config file's mtime changes.
+Provides O(1) symbol lookup, prebuilt per-segment lists and an n-gram
+index for substring search over symbols and names.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+OMX_PATH = CONFIG_DIR / "omx_stockholm.json"
+CONFIG_PATH = CONFIG_DIR / "config.json"
+
+# Segment id (the `cap` query value) -> (key in omx_stockholm.json, default market, display name)
+SEGMENTS = {
+    "large": ("large_cap", "OMX Stockholm", "Large Cap"),
+    "mid": ("mid_cap", "OMX Stockholm", "Mid Cap"),
+    "small": ("small_cap", "OMX Stockholm", "Small Cap"),
+    "first_north": ("first_north", "First North", "First North"),
+    "us": ("us_watchlist", None, "US Market"),
+}
+
+# Search index holds every 1-, 2- and 3-gram; longer queries intersect trigrams
+_NGRAM = 3
+
+
+def _ngrams(text: str, n: int) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class Universe:
+    """Symbol metadata, segment lists and search over the configured universe."""
+
+    def __init__(self, omx_path: Path = OMX_PATH, config_path: Path = CONFIG_PATH):
+        self.omx_path = Path(omx_path)
+        self.config_path = Path(config_path)
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self.version = 0
+        self.omx_data: dict = {}
+        self.config: dict = {}
+        self._stocks: List[dict] = []
+        self._segments: Dict[str, List[dict]] = {}
+        self._positions: Dict[str, List[int]] = {}
+        self._by_symbol: Dict[str, dict] = {}
+        self._watchlist: Dict[str, dict] = {}
+        self._grams: Dict[str, set] = {}
+        self._refresh()
+
+    def _refresh(self):
+        """Reload if either file changed since the last load."""
+        try:
+            mtimes = (self.omx_path.stat().st_mtime_ns, self.config_path.stat().st_mtime_ns)
+        except FileNotFoundError as e:
+            if self._mtimes is None:
+                raise
+            print(f"Universumfil saknas, behåller senaste: {e}")
+            return
+        if mtimes == self._mtimes:
+            return
+        with self._lock:
+            if mtimes != self._mtimes:
+                self._load()
+                self._mtimes = mtimes
+
+    def _load(self):
+        with open(self.omx_path, "r", encoding="utf-8") as f:
+            omx_data = json.load(f)
+        with open(self.config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        stocks, segments, positions, grams = [], {}, {}, {}
+        config_stocks = omx_data.get("stocks", {})
+        for cap, (key, market, _) in SEGMENTS.items():
+            segments[cap] = []
+            positions[cap] = []
+            for stock in config_stocks.get(key, []):
+                entry = {**stock, "cap_size": cap}
+                if market:
+                    entry["market"] = market
+                positions[cap].append(len(stocks))
+                segments[cap].append(entry)
+                stocks.append(entry)
+
+        for i, stock in enumerate(stocks):
+            for text in (stock["symbol"].lower(), stock["name"].lower()):
+                for n in range(1, _NGRAM + 1):
+                    for gram in _ngrams(text, n):
+                        grams.setdefault(gram, set()).add(i)
+
+        by_symbol = {}
+        for stock in stocks:
+            by_symbol.setdefault(stock["symbol"], stock)
+
+        self.omx_data = omx_data
+        self.config = config
+        self._stocks = stocks
+        self._segments = segments
+        self._positions = positions
+        self._by_symbol = by_symbol
+        self._watchlist = {s["symbol"]: s for s in config.get("watchlist", [])}
+        self._grams = grams
+        self.version += 1
+
+    def stocks(self, cap: Optional[str] = None) -> List[dict]:
+        """All stocks in config order, or one segment ("large", "mid", ...)."""
+        self._refresh()
+        if cap is None:
+            return self._stocks
+        return self._segments.get(cap, [])
+
+    def segments(self) -> Dict[str, List[dict]]:
+        self._refresh()
+        return self._segments
+
+    def get(self, symbol: str) -> Optional[dict]:
+        """Metadata for a symbol from the OMX/US lists, then the watchlist."""
+        self._refresh()
+        return self._by_symbol.get(symbol) or self._watchlist.get(symbol)
+
+    def lookup(self, symbol: str) -> dict:
+        """Like get(), but falls back to {"symbol", "name": symbol}."""
+        return self.get(symbol) or {"symbol": symbol, "name": symbol}
+
+    def watchlist(self) -> List[dict]:
+        self._refresh()
+        return list(self._watchlist.values())
+
+    def symbols(self) -> List[str]:
+        """Every configured symbol (all segments plus the watchlist), deduplicated."""
+        self._refresh()
+        return list(dict.fromkeys([*self._by_symbol, *self._watchlist]))
+
+    def search(self, query: str, cap: Optional[str] = None) -> List[dict]:
+        """
+        Stocks whose symbol or name contains `query` (case-insensitive),
+        in config order. Uses the n-gram index instead of scanning.
+        """
+        self._refresh()
+        query = query.lower()
+        if not query:
+            return self.stocks(cap)
+
+        if len(query) <= _NGRAM:
+            candidates = self._grams.get(query, set())
+        else:
+            postings = sorted((self._grams.get(g, set()) for g in _ngrams(query, _NGRAM)), key=len)
+            candidates = set.intersection(*postings) if postings else set()
+
+        if cap is not None:
+            candidates = candidates & set(self._positions.get(cap, []))
+
+        results = []
+        for i in sorted(candidates):
+            stock = self._stocks[i]
+            # Trigram hits are candidates; confirm the full substring
+            if query in stock["symbol"].lower() or query in stock["name"].lower():
+                results.append(stock)
+        return results
+
+
+universe = Universe()
@@ -0,0 +1,216 @@
+"""
+Process-wide gateway for upstream (Yahoo Finance) calls.
+
+Every yfinance call in the backend goes through one UpstreamGateway, so
+overlapping routers, briefings and the poller share a single budget:
+- a token bucket caps the request rate (a bulk download costs one token per symbol)
+- AIMD concurrency: the in-flight limit grows by ~1 per window of fast,
+  successful calls and is halved on throttling or slow responses. A bulk
+  call holds one slot, and its latency is judged per request it makes
+  (wall time / cost), so a long 200-symbol download does not count as slow
+- throttled and transient failures are retried with full-jitter exponential backoff
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class UpstreamThrottled(Exception):
+    """Upstream answered 429 / rate limited."""
+
+
+# Log messages yfinance emits when it swallows a rate-limit error (e.g. in yf.download)
+_THROTTLE_MARKERS = ("too many requests", "rate limit", "429")
+
+
+def _is_throttle(exc: BaseException) -> bool:
+    if isinstance(exc, UpstreamThrottled) or type(exc).__name__ == "YFRateLimitError":
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or any(m in str(exc).lower() for m in _THROTTLE_MARKERS)
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None and status >= 500:
+        return True
+    # requests / curl_cffi timeouts and connection errors
+    return any(name in type(exc).__name__ for name in ("Timeout", "ConnectionError", "DNSError"))
+
+
+class _ThrottleLogWatcher(logging.Handler):
+    """
+    Counts throttling messages logged by yfinance, which swallows some of them.
+
+    Counts are kept per thread: a call only sees the messages logged while it
+    ran on its own thread, so one throttled call does not fail every other
+    call in flight.
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self._local = threading.local()
+
+    @property
+    def count(self) -> int:
+        """Throttling messages logged so far by the current thread."""
+        return getattr(self._local, "count", 0)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = record.getMessage().lower()
+        except Exception:
+            return
+        if any(m in message for m in _THROTTLE_MARKERS):
+            self._local.count = self.count + 1
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` stored."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` (capped at burst) are available, then take them."""
+        tokens = min(tokens, self.burst)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class UpstreamGateway:
+    """Rate-limited, adaptively concurrent, retrying wrapper around upstream calls."""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        target_latency: float = 3.0,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._limit = float(min(4, max_concurrency))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._watcher = _ThrottleLogWatcher()
+        logging.getLogger("yfinance").addHandler(self._watcher)
+        self._local = threading.local()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def last_throttled(self) -> bool:
+        """True if the last call on this thread was throttled (even if it returned a result)."""
+        return getattr(self._local, "throttled", False)
+
+    def _enter(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _exit(self, latency: float, throttled: bool):
+        """Release a slot; `latency` is per upstream request (wall time / cost)."""
+        with self._cond:
+            self._in_flight -= 1
+            if throttled or latency > 2 * self.target_latency:
+                # Multiplicative decrease
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+            elif latency <= self.target_latency:
+                # Additive increase: about +1 per `limit` successful calls
+                self._limit = min(float(self.max_concurrency), self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int):
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def call(self, func: Callable[..., T], *args, cost: float = 1, partial: bool = False, **kwargs) -> T:
+        """
+        Run func(*args, **kwargs) under the rate and concurrency limits.
+
+        Args:
+            cost: Tokens to take (number of upstream requests the call makes)
+            partial: If yfinance logs throttling but still returns a result
+                (a bulk download where only some symbols failed), return it
+                instead of retrying the whole call; check `last_throttled`
+                and retry the missing parts
+
+        Raises:
+            The last exception if all retries fail, or any non-retryable error
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire(cost)
+            self._enter()
+            logged = self._watcher.count
+            started = time.monotonic()
+            throttled = False
+            self._local.throttled = False
+            try:
+                self.stats["calls"] += 1
+                result = func(*args, **kwargs)
+                throttled = self._watcher.count > logged
+                if throttled:
+                    self.stats["throttled"] += 1
+                    self._local.throttled = True
+                    if not partial and attempt < self.retries:
+                        raise UpstreamThrottled(f"{self.name}: rate limited (logged by yfinance)")
+                return result
+            except Exception as e:
+                if not throttled and _is_throttle(e):
+                    throttled = True
+                    self.stats["throttled"] += 1
+                    self._local.throttled = True
+                if attempt >= self.retries or not (throttled or _is_transient(e)):
+                    self.stats["failures"] += 1
+                    raise
+            finally:
+                self._exit((time.monotonic() - started) / max(cost, 1), throttled)
+
+            attempt += 1
+            self.stats["retries"] += 1
+            self._backoff(attempt)
+
+
+yahoo = UpstreamGateway(
+    "yahoo",
+    rate=float(os.environ.get("YAHOO_RATE_PER_SECOND", "20")),
+    burst=float(os.environ.get("YAHOO_BURST", "200")),
+    max_concurrency=int(os.environ.get("YAHOO_MAX_CONCURRENCY", "8")),
+)
@@ -0,0 +1,89 @@
+"""
+Background cache warm-up after startup.
+
+Steps are registered in priority order and run one after another on a
+daemon thread, so startup itself is not delayed. Progress is exposed for
+the /ready endpoint: the service reports ready once every critical step
+has finished (a failed step counts as finished, so an upstream outage
+cannot hold traffic forever).
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+
+class WarmUpStep:
+    def __init__(self, name: str, func: Callable[[], object], critical: bool):
+        self.name = name
+        self.func = func
+        self.critical = critical
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "critical": self.critical,
+            "status": self.status,
+            "seconds": self.seconds,
+            "error": self.error,
+        }
+
+
+class WarmUp:
+    """Ordered warm-up steps with progress reporting."""
+
+    def __init__(self):
+        self._steps: List[WarmUpStep] = []
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[datetime] = None
+
+    def add(self, name: str, func: Callable[[], object], critical: bool = False):
+        """Register a step; steps run in the order they are added."""
+        self._steps.append(WarmUpStep(name, func, critical))
+
+    def start(self):
+        """Run all steps on a background thread (once)."""
+        if self._thread is not None:
+            return
+        self.started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, name="cache-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for step in self._steps:
+            step.status = "running"
+            started = time.monotonic()
+            try:
+                step.func()
+                step.status = "done"
+            except Exception as e:
+                step.status = "failed"
+                step.error = str(e)
+                print(f"[{datetime.now()}] Warm-up step {step.name} failed: {e}")
+            step.seconds = round(time.monotonic() - started, 2)
+        print(f"[{datetime.now()}] Warm-up finished")
+
+    @property
+    def ready(self) -> bool:
+        return self._thread is not None and all(s.finished for s in self._steps if s.critical)
+
+    def progress(self) -> dict:
+        finished = sum(s.finished for s in self._steps)
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished": finished,
+            "total": len(self._steps),
+            "steps": [s.to_dict() for s in self._steps],
+        }
+
+
+warmup = WarmUp()
@@ -1,11 +1,18 @@
 "use client";
 
+import { useMemo, useSyncExternalStore } from "react";
 import useSWR from "swr";
-import { fetchAPI } from "@/lib/api";
+import { apiUrl, fetchAPI } from "@/lib/api";
 import type { WatchlistStock, StockAnalysis, OHLCVRecord } from "@/types/stock";
 
 const fetcher = <T>(path: string) => fetchAPI<T>(path);
 
+// Quote values arrive over the stream; REST lists are only re-fetched for
+// membership and order this often, or at the old polling rate while the
+// stream is down.
+const RERANK_INTERVAL = 300_000;
+const FALLBACK_POLL_INTERVAL = 60_000;
+
 interface AllStocksParams {
   cap?: string | null;
   search?: string;
@@ -46,18 +53,37 @@ export function useAllStocks(params: AllStocksParams = {}) {
 
   const key = `/api/stocks/all?${queryParams.toString()}`;
 
-  return useSWR<AllStocksResponse>(key, fetcher, {
-    refreshInterval: 60_000,
+  const live = useQuoteStream();
+  const result = useSWR<AllStocksResponse>(key, fetcher, {
+    refreshInterval: live.connected ? RERANK_INTERVAL : FALLBACK_POLL_INTERVAL,
     revalidateOnFocus: false,
   });
+
+  const data = useMemo(() => {
+    if (!result.data) return result.data;
+    const stocks = withLiveQuotes(result.data.stocks, live.quotes);
+    const sortKey = (sortBy === "price" ? "current_price" : sortBy) as keyof WatchlistStock;
+    return { ...result.data, stocks: sortRows(stocks, sortKey, sortDesc) };
+  }, [result.data, live.quotes, sortBy, sortDesc]);
+
+  return { ...result, data };
 }
 
 export function useTopMovers() {
-  return useSWR<TopMoversResponse>(
-    "/api/stocks/top-movers",
-    fetcher,
-    { refreshInterval: 60_000 }
-  );
+  const live = useQuoteStream();
+  const result = useSWR<TopMoversResponse>("/api/stocks/top-movers", fetcher, {
+    refreshInterval: live.connected ? RERANK_INTERVAL : FALLBACK_POLL_INTERVAL,
+  });
+
+  const data = useMemo(() => {
+    if (!result.data) return result.data;
+    return {
+      gainers: sortRows(withLiveQuotes(result.data.gainers, live.quotes), "change_percent", true),
+      losers: sortRows(withLiveQuotes(result.data.losers, live.quotes), "change_percent", false),
+    };
+  }, [result.data, live.quotes]);
+
+  return { ...result, data };
 }
 
 export function useCapSizes() {
@@ -69,11 +95,17 @@ export function useCapSizes() {
 }
 
 export function useWatchlist() {
-  return useSWR<{ stocks: WatchlistStock[] }>(
-    "/api/stocks/watchlist",
-    fetcher,
-    { refreshInterval: 60_000 }
+  const live = useQuoteStream();
+  const result = useSWR<{ stocks: WatchlistStock[] }>("/api/stocks/watchlist", fetcher, {
+    refreshInterval: live.connected ? RERANK_INTERVAL : FALLBACK_POLL_INTERVAL,
+  });
+
+  const data = useMemo(
+    () => (result.data ? { stocks: withLiveQuotes(result.data.stocks, live.quotes) } : result.data),
+    [result.data, live.quotes]
   );
+
+  return { ...result, data };
 }
 
 export function useStockAnalysis(symbol: string) {
@@ -90,3 +122,107 @@ export function useStockHistory(symbol: string, days: number = 30) {
     fetcher
   );
 }
+
+type QuoteUpdates = Record<string, Partial<WatchlistStock>>;
+
+interface QuoteStreamState {
+  quotes: QuoteUpdates;
+  connected: boolean;
+}
+
+/**
+ * One EventSource per browser tab for the whole universe, shared by every
+ * hook: opened by the first subscriber and closed after the last one leaves.
+ * Starts from a full snapshot and merges the changed fields of each update;
+ * the browser reconnects with Last-Event-ID and the server replays what was missed.
+ */
+class QuoteStream {
+  state: QuoteStreamState = { quotes: {}, connected: false };
+  private listeners = new Set<() => void>();
+  private source: EventSource | null = null;
+
+  private set(next: Partial<QuoteStreamState>) {
+    this.state = { ...this.state, ...next };
+    this.listeners.forEach((listener) => listener());
+  }
+
+  private open() {
+    const source = new EventSource(apiUrl("/api/stocks/stream"));
+    source.onopen = () => this.set({ connected: true });
+    source.onerror = () => this.set({ connected: false });
+    source.addEventListener("snapshot", (event) => {
+      this.set({ quotes: JSON.parse((event as MessageEvent).data), connected: true });
+    });
+    source.addEventListener("quotes", (event) => {
+      const changes: QuoteUpdates = JSON.parse((event as MessageEvent).data);
+      const quotes = { ...this.state.quotes };
+      for (const [symbol, fields] of Object.entries(changes)) {
+        quotes[symbol] = { ...quotes[symbol], ...fields };
+      }
+      this.set({ quotes });
+    });
+    this.source = source;
+  }
+
+  subscribe = (listener: () => void) => {
+    this.listeners.add(listener);
+    if (!this.source) this.open();
+    return () => {
+      this.listeners.delete(listener);
+      if (this.listeners.size === 0 && this.source) {
+        this.source.close();
+        this.source = null;
+        this.state = { quotes: {}, connected: false };
+      }
+    };
+  };
+
+  getSnapshot = () => this.state;
+}
+
+const quoteStream = new QuoteStream();
+
+const SERVER_STATE: QuoteStreamState = { quotes: {}, connected: false };
+
+/** Live quotes for the whole universe over Server-Sent Events from /api/stocks/stream. */
+export function useQuoteStream(): QuoteStreamState {
+  return useSyncExternalStore(
+    quoteStream.subscribe,
+    quoteStream.getSnapshot,
+    () => SERVER_STATE
+  );
+}
+
+// Row fields that come from the quote (the rest is stock metadata)
+const LIVE_FIELDS = [
+  "current_price",
+  "change_percent",
+  "volume_vs_avg",
+  "currency",
+  "high_52w",
+  "low_52w",
+  "error",
+] as const;
+
+/** Rows with the latest streamed quote fields merged in (null means the field was cleared). */
+function withLiveQuotes(rows: WatchlistStock[], quotes: QuoteUpdates): WatchlistStock[] {
+  return rows.map((row) => {
+    const live = quotes[row.symbol];
+    if (!live) return row;
+    const merged: WatchlistStock = { ...row };
+    for (const field of LIVE_FIELDS) {
+      if (field in live) {
+        (merged as unknown as Record<string, unknown>)[field] = live[field] ?? undefined;
+      }
+    }
+    return merged;
+  });
+}
+
+function sortRows(rows: WatchlistStock[], key: keyof WatchlistStock, desc: boolean): WatchlistStock[] {
+  const value = (row: WatchlistStock) => {
+    const v = row[key];
+    return typeof v === "number" ? v : 0;
+  };
+  return [...rows].sort((a, b) => (desc ? value(b) - value(a) : value(a) - value(b)));
+}